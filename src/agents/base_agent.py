@@ -2,19 +2,239 @@
 Base Agent class for all banking agents using Google Generative AI.
 """
 
+import io
 import os
 import json
-from datetime import datetime
+import mmap
+import asyncio
+import atexit
+import threading
+from datetime import datetime, timezone
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional, List
+from typing import (
+    Dict, Any, Optional, List, Set, Tuple, TextIO, FrozenSet, Iterator
+)
 import csv
 
 import google.generativeai as genai
 
+# Read once; genai.configure is called only before the first model is built
+_GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+
+# Models shared by all agent instances, keyed by (model name, system prompt)
+_MODEL_CACHE: Dict[Tuple[str, str], genai.GenerativeModel] = {}
+_MODEL_LOCK = threading.Lock()
+
+# In-memory copy of clientes.csv shared by all agents, stored column-wise
+# with a CPF -> row index map, the byte span of each row in the file and
+# the CPFs changed since the file was last written
+_CLIENTS_FILE: Optional[str] = None
+_CLIENTS_MTIME: Optional[float] = None
+_CLIENTS_COLUMNS: Dict[str, List[str]] = {}
+_CLIENTS_CPF_INDEX: Dict[str, int] = {}
+_CLIENTS_OFFSETS: Dict[str, Tuple[int, int]] = {}
+_CLIENTS_DIRTY_ROWS: Set[str] = set()
+_CLIENTS_LOCK = threading.RLock()
+
+# Clients files being loaded into the store by a background thread
+_CLIENTS_WARMING: Set[str] = set()
+
+
+def _updates_file(clients_file: str) -> str:
+    """Get the path of the append-only update log for a clients file."""
+    root, ext = os.path.splitext(clients_file)
+    return f"{root}_updates{ext}"
+
+
+def _clients_loaded(clients_file: str) -> bool:
+    """
+    Check whether the shared column store holds the current clients file.
+
+    Must be called with _CLIENTS_LOCK held.
+
+    Args:
+        clients_file: Path to the clients CSV file
+
+    Returns:
+        True if the store is loaded and the file has not changed since
+    """
+    clients_file = os.path.abspath(clients_file)
+    return (
+        _CLIENTS_FILE == clients_file
+        and _CLIENTS_MTIME == os.path.getmtime(clients_file)
+    )
+
+
+def _row_offsets(filepath: str) -> Dict[str, Tuple[int, int]]:
+    """
+    Map the first column of each CSV row to the row's byte span in the file.
+
+    Args:
+        filepath: Path to the CSV file
+
+    Returns:
+        Dictionary mapping key to (start offset, length without line ending)
+    """
+    offsets = {}
+    with open(filepath, "rb") as file:
+        pos = len(file.readline())  # Skip header
+        for line in file:
+            content = line.rstrip(b"\r\n")
+            if content:
+                row = next(csv.reader([content.decode("utf-8")]))
+                offsets[row[0]] = (pos, len(content))
+            pos += len(line)
+    return offsets
+
+
+def _write_dirty_rows_in_place() -> bool:
+    """
+    Overwrite the changed client rows directly in clientes.csv.
+
+    Only possible when every changed row serializes to exactly the same
+    number of bytes it occupies in the file. Must be called with
+    _CLIENTS_LOCK held.
+
+    Returns:
+        True if the rows were written, False if a full rewrite is needed
+    """
+    patches = []
+    for cpf in _CLIENTS_DIRTY_ROWS:
+        span = _CLIENTS_OFFSETS.get(cpf)
+        if span is None:
+            return False
+        i = _CLIENTS_CPF_INDEX[cpf]
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator="").writerow(
+            values[i] for values in _CLIENTS_COLUMNS.values()
+        )
+        data = buffer.getvalue().encode("utf-8")
+        if len(data) != span[1]:
+            return False
+        patches.append((span[0], data))
+
+    with open(_CLIENTS_FILE, "r+b") as file:
+        for start, data in patches:
+            file.seek(start)
+            file.write(data)
+    return True
+
+
+def _read_clients(clients_file: str) -> Tuple[
+    float, Dict[str, List[str]], Dict[str, int], Dict[str, Tuple[int, int]], Set[str]
+]:
+    """
+    Parse clientes.csv and replay its pending updates, without touching the store.
+
+    Args:
+        clients_file: Absolute path to the clients CSV file
+
+    Returns:
+        Tuple of (mtime, columns, CPF index, row offsets, changed CPFs), as
+        installed by _install_clients
+    """
+    mtime = os.path.getmtime(clients_file)
+    columns = BaseAgent.read_csv_columnar(clients_file)
+    cpf_index = {cpf: i for i, cpf in enumerate(columns.get("cpf", []))}
+
+    # Replay updates that have not been compacted into the file yet
+    updates_file = _updates_file(clients_file)
+    dirty_rows = set()
+    if os.path.isfile(updates_file):
+        BaseAgent.close_append_writers(updates_file)
+        for update in BaseAgent.read_csv(updates_file):
+            i = cpf_index.get(update["cpf"])
+            if i is not None:
+                columns[update["field"]][i] = update["value"]
+                dirty_rows.add(update["cpf"])
+
+    return mtime, columns, cpf_index, _row_offsets(clients_file), dirty_rows
+
+
+def _install_clients(clients_file: str, snapshot: Tuple) -> None:
+    """
+    Make a snapshot from _read_clients the shared column store.
+
+    Must be called with _CLIENTS_LOCK held.
+
+    Args:
+        clients_file: Absolute path to the clients CSV file
+        snapshot: Result of _read_clients for that file
+    """
+    global _CLIENTS_FILE, _CLIENTS_MTIME, _CLIENTS_COLUMNS, _CLIENTS_CPF_INDEX
+    global _CLIENTS_OFFSETS, _CLIENTS_DIRTY_ROWS
+
+    (
+        _CLIENTS_MTIME,
+        _CLIENTS_COLUMNS,
+        _CLIENTS_CPF_INDEX,
+        _CLIENTS_OFFSETS,
+        _CLIENTS_DIRTY_ROWS,
+    ) = snapshot
+    _CLIENTS_FILE = clients_file
+
+
+def _load_clients(clients_file: str) -> Dict[str, int]:
+    """
+    Load clientes.csv into the shared column store, reusing it while unchanged.
+
+    Must be called with _CLIENTS_LOCK held.
+
+    Args:
+        clients_file: Path to the clients CSV file
+
+    Returns:
+        Dictionary mapping CPF to its row index in _CLIENTS_COLUMNS
+    """
+    clients_file = os.path.abspath(clients_file)
+    if not _clients_loaded(clients_file):
+        _install_clients(clients_file, _read_clients(clients_file))
+    return _CLIENTS_CPF_INDEX
+
+
+def _warm_clients_in_background(clients_file: str):
+    """
+    Load clientes.csv into the shared column store from a daemon thread.
+
+    The file is parsed without holding _CLIENTS_LOCK, and the result is
+    dropped if the file changed or got an update log in the meantime (the
+    store was then loaded by update_client). Must be called with
+    _CLIENTS_LOCK held; a file already being loaded is not loaded twice.
+
+    Args:
+        clients_file: Path to the clients CSV file
+    """
+    clients_file = os.path.abspath(clients_file)
+    if clients_file in _CLIENTS_WARMING:
+        return
+    _CLIENTS_WARMING.add(clients_file)
+
+    def warm():
+        try:
+            snapshot = _read_clients(clients_file)
+            with _CLIENTS_LOCK:
+                if (
+                    not _clients_loaded(clients_file)
+                    and os.path.getmtime(clients_file) == snapshot[0]
+                    and not os.path.isfile(_updates_file(clients_file))
+                ):
+                    _install_clients(clients_file, snapshot)
+        except (OSError, ValueError) as e:
+            print(f"Error loading clients: {str(e)}")
+        finally:
+            with _CLIENTS_LOCK:
+                _CLIENTS_WARMING.discard(clients_file)
+
+    threading.Thread(target=warm, name="clients-warm", daemon=True).start()
+
 
 class BaseAgent(ABC):
     """Base class for all banking agents."""
 
+    # Long-lived buffered writers used by append_csv, keyed by absolute path
+    _append_writers: Dict[str, Tuple[TextIO, csv.DictWriter, FrozenSet[str]]] = {}
+    _append_lock = threading.Lock()
+
     def __init__(self, agent_name: str, model_name: str = "gemini-2.5-flash"):
         """
         Initialize the agent with Google Generative AI.
@@ -28,14 +248,25 @@ class BaseAgent(ABC):
         self.conversation_history = []
 
         # Initialize Google Generative AI
-        api_key = os.getenv("GOOGLE_API_KEY")
-        if not api_key:
-            raise ValueError(
-                "GOOGLE_API_KEY environment variable not set. "
-                "Please set it to your Google API key."
-            )
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel(model_name)
+        system_prompt = self.get_system_prompt()
+        key = (model_name, system_prompt)
+        with _MODEL_LOCK:
+            if key not in _MODEL_CACHE:
+                if not _GOOGLE_API_KEY:
+                    raise ValueError(
+                        "GOOGLE_API_KEY environment variable not set. "
+                        "Please set it to your Google API key."
+                    )
+                if not _MODEL_CACHE:
+                    genai.configure(api_key=_GOOGLE_API_KEY)
+                _MODEL_CACHE[key] = genai.GenerativeModel(
+                    model_name, system_instruction=system_prompt
+                )
+            self.model = _MODEL_CACHE[key]
+
+        # Native chat session: the SDK keeps the turns and only the new
+        # message is added per call instead of re-sending a flattened transcript
+        self.chat = self.model.start_chat(history=[])
 
     @abstractmethod
     def get_system_prompt(self) -> str:
@@ -55,28 +286,74 @@ class BaseAgent(ABC):
         # Add user message to history
         self.conversation_history.append({"role": "user", "content": user_message})
 
-        # Build the conversation with system prompt
-        messages = []
+        try:
+            # Send to Google Generative AI
+            response = self.chat.send_message(user_message)
+            assistant_message = response.text
 
-        # Add system prompt as first message
-        system_prompt = self.get_system_prompt()
-        messages.append(
-            {
-                "role": "user",
-                "content": f"[SYSTEM PROMPT]\n{system_prompt}\n\n[USER MESSAGE]\n{user_message}",
-            }
+            # Add assistant response to history
+            self.conversation_history.append(
+                {"role": "assistant", "content": assistant_message}
+            )
+
+            return assistant_message
+        except Exception as e:
+            error_message = f"Error calling Google Generative AI: {str(e)}"
+            return error_message
+
+    def send_message_stream(self, user_message: str) -> Iterator[str]:
+        """
+        Send a message to the agent and yield the response as it arrives.
+
+        The exchange is added to the conversation history only once the
+        stream is exhausted. If the request fails, or the stream is closed
+        before the end, the chat is restored to its previous state so later
+        messages are not sent on top of an incomplete turn.
+
+        Args:
+            user_message: The user's message
+
+        Yields:
+            Chunks of the agent's response text
+
+        Raises:
+            Exception: Whatever the SDK raised, after the chat is restored
+        """
+        history = list(self.chat.history)
+        chunks: List[str] = []
+        completed = False
+        try:
+            for chunk in self.chat.send_message(user_message, stream=True):
+                chunks.append(chunk.text)
+                yield chunk.text
+            completed = True
+        finally:
+            if not completed:
+                self.chat.history = history
+
+        self.conversation_history.append({"role": "user", "content": user_message})
+        self.conversation_history.append(
+            {"role": "assistant", "content": "".join(chunks)}
         )
 
-        # Add conversation history (simplified for API)
-        for msg in self.conversation_history[:-1]:  # Exclude the one we just added
-            role = "user" if msg["role"] == "user" else "model"
-            messages[-1][
-                "content"
-            ] += f"\n\n[PREVIOUS MESSAGE]\n{msg['content']}"
+    async def send_message_async(self, user_message: str) -> str:
+        """
+        Send a message to the agent without blocking the event loop.
+
+        Independent agents can be awaited together with asyncio.gather so
+        their model round-trips overlap.
+
+        Args:
+            user_message: The user's message
+
+        Returns:
+            The agent's response
+        """
+        # Add user message to history
+        self.conversation_history.append({"role": "user", "content": user_message})
 
         try:
-            # Send to Google Generative AI
-            response = self.model.generate_content(messages[-1]["content"])
+            response = await self.chat.send_message_async(user_message)
             assistant_message = response.text
 
             # Add assistant response to history
@@ -89,9 +366,54 @@ class BaseAgent(ABC):
             error_message = f"Error calling Google Generative AI: {str(e)}"
             return error_message
 
+    async def batch_send(self, prompts: List[str]) -> List[str]:
+        """
+        Send independent one-shot prompts concurrently.
+
+        Each prompt is answered with this agent's system prompt only; the
+        conversation history is neither used nor updated.
+
+        Args:
+            prompts: Messages to send
+
+        Returns:
+            Responses in the same order as the prompts
+        """
+        responses = await asyncio.gather(
+            *(self.model.generate_content_async(prompt) for prompt in prompts),
+            return_exceptions=True,
+        )
+
+        results = []
+        for response in responses:
+            if isinstance(response, Exception):
+                results.append(f"Error calling Google Generative AI: {str(response)}")
+            else:
+                results.append(response.text)
+        return results
+
     def clear_history(self):
         """Clear conversation history."""
         self.conversation_history = []
+        self.chat = self.model.start_chat(history=[])
+
+    @staticmethod
+    def _require_files(*filepaths: str):
+        """
+        Check that the data files an agent depends on exist.
+
+        Called once from the agent constructor so the CSV helpers can skip
+        defensive checks on every call.
+
+        Args:
+            filepaths: Paths to the required files
+
+        Raises:
+            FileNotFoundError: If any of the files is missing
+        """
+        for filepath in filepaths:
+            if not os.path.isfile(filepath):
+                raise FileNotFoundError(f"Required data file not found: {filepath}")
 
     @staticmethod
     def read_csv(filepath: str) -> List[Dict[str, Any]]:
@@ -104,15 +426,52 @@ class BaseAgent(ABC):
         Returns:
             List of dictionaries representing rows
         """
-        try:
-            data = []
-            with open(filepath, "r", encoding="utf-8") as file:
-                reader = csv.DictReader(file)
-                for row in reader:
-                    data.append(row)
-            return data
-        except Exception as e:
-            raise Exception(f"Error reading CSV file {filepath}: {str(e)}")
+        data = []
+        with open(filepath, "r", encoding="utf-8") as file:
+            reader = csv.DictReader(file)
+            for row in reader:
+                data.append(row)
+        return data
+
+    @staticmethod
+    def read_csv_columnar(filepath: str) -> Dict[str, List[str]]:
+        """
+        Read a CSV file into one list per column.
+
+        Rows are parsed as plain tuples with csv.reader, so no dictionary is
+        allocated per row. Short rows are padded with empty values, as
+        csv.DictWriter writes the fields csv.DictReader left missing.
+
+        Args:
+            filepath: Path to the CSV file
+
+        Returns:
+            Dictionary mapping each header to the list of its column values
+
+        Raises:
+            ValueError: If a row has more fields than the header
+        """
+        with open(filepath, "r", newline="", encoding="utf-8") as file:
+            reader = csv.reader(file)
+            headers = next(reader, [])
+            width = len(headers)
+            rows = []
+            for row in reader:
+                if not row:
+                    continue
+                if len(row) > width:
+                    raise ValueError(
+                        f"{filepath} line {reader.line_num}: {len(row)} fields, "
+                        f"expected {width}"
+                    )
+                if len(row) < width:
+                    row += [""] * (width - len(row))
+                rows.append(row)
+        if not rows:
+            return {header: [] for header in headers}
+        return {
+            header: list(values) for header, values in zip(headers, zip(*rows))
+        }
 
     @staticmethod
     def write_csv(filepath: str, data: List[Dict[str, Any]], headers: List[str]):
@@ -124,40 +483,256 @@ class BaseAgent(ABC):
             data: List of dictionaries to write
             headers: Column headers
         """
-        try:
-            with open(filepath, "w", newline="", encoding="utf-8") as file:
-                writer = csv.DictWriter(file, fieldnames=headers)
-                writer.writeheader()
-                writer.writerows(data)
-        except Exception as e:
-            raise Exception(f"Error writing CSV file {filepath}: {str(e)}")
+        with open(filepath, "w", newline="", encoding="utf-8") as file:
+            writer = csv.DictWriter(file, fieldnames=headers)
+            writer.writeheader()
+            writer.writerows(data)
 
     @staticmethod
-    def append_csv(filepath: str, row: Dict[str, Any]):
+    def write_csv_columnar(filepath: str, columns: Dict[str, List[str]]):
+        """
+        Write column-wise data to a CSV file.
+
+        Args:
+            filepath: Path to the CSV file
+            columns: Dictionary mapping each header to its column values
+        """
+        with open(filepath, "w", newline="", encoding="utf-8") as file:
+            writer = csv.writer(file)
+            writer.writerow(columns.keys())
+            writer.writerows(zip(*columns.values()))
+
+    @staticmethod
+    def append_csv(filepath: str, row: Dict[str, Any], flush: bool = False):
         """
         Append a row to a CSV file.
 
+        The file is kept open with a large write buffer and reused by later
+        calls; unless flush is set, rows reach the disk when the buffer
+        fills or when close_append_writers runs (at the latest, at
+        interpreter exit).
+
         Args:
             filepath: Path to the CSV file
             row: Dictionary representing the row to append
+            flush: Hand the row to the OS right away, so it survives the
+                process being killed
         """
-        try:
-            # Check if file exists and has content
-            file_exists = os.path.isfile(filepath) and os.path.getsize(filepath) > 0
-
-            with open(filepath, "a", newline="", encoding="utf-8") as file:
-                if file_exists:
-                    # File has content, just append
-                    writer = csv.DictWriter(file, fieldnames=row.keys())
-                    writer.writerow(row)
-                else:
-                    # File is empty or doesn't exist, write header and row
-                    writer = csv.DictWriter(file, fieldnames=row.keys())
+        filepath = os.path.abspath(filepath)
+        with BaseAgent._append_lock:
+            entry = BaseAgent._append_writers.get(filepath)
+            if entry is None:
+                # Check if file exists and has content
+                file_exists = (
+                    os.path.isfile(filepath) and os.path.getsize(filepath) > 0
+                )
+                file = open(
+                    filepath, "a", newline="", encoding="utf-8", buffering=1 << 16
+                )
+                writer = csv.DictWriter(file, fieldnames=list(row.keys()))
+                if not file_exists:
                     writer.writeheader()
-                    writer.writerow(row)
-        except Exception as e:
-            raise Exception(f"Error appending to CSV file {filepath}: {str(e)}")
+                entry = (file, writer, frozenset(row.keys()))
+                BaseAgent._append_writers[filepath] = entry
+
+            file, writer, fieldnames = entry
+            if row.keys() != fieldnames:
+                raise ValueError(
+                    f"Row keys {sorted(row.keys())} do not match "
+                    f"columns {writer.fieldnames}"
+                )
+            writer.writerow(row)
+            if flush:
+                file.flush()
+
+    @staticmethod
+    def close_append_writers(filepath: Optional[str] = None):
+        """
+        Flush and close the buffered writers opened by append_csv.
+
+        Args:
+            filepath: Only close the writer for this file (default: all)
+        """
+        with BaseAgent._append_lock:
+            if filepath is None:
+                paths = list(BaseAgent._append_writers)
+            else:
+                paths = [os.path.abspath(filepath)]
+            for path in paths:
+                entry = BaseAgent._append_writers.pop(path, None)
+                if entry is not None:
+                    entry[0].close()
+
+    @staticmethod
+    def _mmap_find_row(
+        filepath: str, key_col_idx: int, key_value: str
+    ) -> Optional[Dict[str, str]]:
+        """
+        Find a single row in a CSV file without parsing the whole file.
+
+        The file is memory-mapped and searched for the key bytes; only the
+        candidate lines are decoded and parsed.
+
+        Args:
+            filepath: Path to the CSV file
+            key_col_idx: Index of the column holding the key
+            key_value: Value the key column must equal
+
+        Returns:
+            Dictionary representing the row, or None if not found
+        """
+        if not key_value:
+            return None
+
+        with open(filepath, "rb") as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return None
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                header_end = mm.find(b"\n")
+                if header_end < 0:
+                    return None
+                headers = next(csv.reader([mm[:header_end].decode("utf-8")]))
+
+                key = key_value.encode("utf-8")
+                pos = mm.find(key, header_end + 1)
+                while pos >= 0:
+                    start = mm.rfind(b"\n", 0, pos) + 1
+                    end = mm.find(b"\n", pos)
+                    if end < 0:
+                        end = len(mm)
+                    row = next(csv.reader([mm[start:end].decode("utf-8")]), [])
+                    if len(row) > key_col_idx and row[key_col_idx] == key_value:
+                        row += [""] * (len(headers) - len(row))
+                        return dict(zip(headers, row))
+                    pos = mm.find(key, end)
+        return None
+
+    @staticmethod
+    def is_client_index_warm(clients_file: str) -> bool:
+        """
+        Check whether client lookups can be served from memory.
+
+        Args:
+            clients_file: Path to the clients CSV file
+
+        Returns:
+            True if the shared column store is loaded and up to date
+        """
+        with _CLIENTS_LOCK:
+            try:
+                return _clients_loaded(clients_file)
+            except OSError:
+                return False
+
+    @staticmethod
+    def find_client(clients_file: str, cpf: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a client by CPF in the shared in-memory index.
+
+        While the index is cold the row is read straight from the file and
+        the index is loaded in the background for the lookups that follow.
+
+        Args:
+            clients_file: Path to the clients CSV file
+            cpf: Client's CPF (number only, without punctuation)
+
+        Returns:
+            Copy of the client row, or None if the CPF is unknown
+        """
+        with _CLIENTS_LOCK:
+            if _clients_loaded(clients_file) or os.path.isfile(
+                _updates_file(os.path.abspath(clients_file))
+            ):
+                i = _load_clients(clients_file).get(cpf)
+                if i is None:
+                    return None
+                return {
+                    column: values[i] for column, values in _CLIENTS_COLUMNS.items()
+                }
+
+            # Cold index and no pending updates: the file on disk is
+            # authoritative, so look up just this row, outside the lock
+            _warm_clients_in_background(clients_file)
+        return BaseAgent._mmap_find_row(clients_file, 0, cpf)
+
+    @staticmethod
+    def update_client(clients_file: str, cpf: str, field: str, value: Any) -> bool:
+        """
+        Update a single field of a client.
+
+        The change is applied to the in-memory columns and appended to the
+        update log; clientes.csv itself is only rewritten by
+        compact_clients_file.
+
+        Args:
+            clients_file: Path to the clients CSV file
+            cpf: Client's CPF
+            field: Column to update
+            value: New value for the column
+
+        Returns:
+            True if the client exists and was updated
+        """
+        with _CLIENTS_LOCK:
+            i = _load_clients(clients_file).get(cpf)
+            if i is None:
+                return False
+            if _CLIENTS_COLUMNS[field][i] == str(value):
+                return True
+            _CLIENTS_COLUMNS[field][i] = str(value)
+
+            BaseAgent.append_csv(
+                _updates_file(_CLIENTS_FILE),
+                {
+                    "cpf": cpf,
+                    "field": field,
+                    "value": str(value),
+                    "ts": datetime.now(timezone.utc).isoformat(),
+                },
+                # The log is the only durable record until compaction
+                flush=True,
+            )
+            _CLIENTS_DIRTY_ROWS.add(cpf)
+            return True
+
+    @staticmethod
+    def compact_clients_file(clients_file: Optional[str] = None):
+        """
+        Write pending client updates into clientes.csv and clear the log.
+
+        Changed rows are overwritten in place when their serialized size is
+        unchanged; otherwise the whole file is rewritten. Runs automatically
+        at interpreter exit.
+
+        Args:
+            clients_file: Path to the clients CSV file (default: the one
+                currently loaded)
+        """
+        global _CLIENTS_MTIME, _CLIENTS_OFFSETS, _CLIENTS_DIRTY_ROWS
+
+        with _CLIENTS_LOCK:
+            if clients_file is not None:
+                _load_clients(clients_file)
+            if _CLIENTS_FILE is None:
+                return
+
+            if _CLIENTS_DIRTY_ROWS:
+                if not _write_dirty_rows_in_place():
+                    BaseAgent.write_csv_columnar(_CLIENTS_FILE, _CLIENTS_COLUMNS)
+                    _CLIENTS_OFFSETS = _row_offsets(_CLIENTS_FILE)
+                _CLIENTS_MTIME = os.path.getmtime(_CLIENTS_FILE)
+                _CLIENTS_DIRTY_ROWS = set()
+
+            updates_file = _updates_file(_CLIENTS_FILE)
+            BaseAgent.close_append_writers(updates_file)
+            if os.path.isfile(updates_file):
+                os.remove(updates_file)
 
     def get_conversation_history(self) -> List[Dict[str, str]]:
         """Get the conversation history."""
         return self.conversation_history
+
+
+# atexit runs handlers in reverse order: compact first, then flush the rest
+atexit.register(BaseAgent.close_append_writers)
+atexit.register(BaseAgent.compact_clients_file)
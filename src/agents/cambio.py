@@ -5,14 +5,109 @@ This agent handles currency exchange inquiries and quotations.
 """
 
 import os
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, Any, AsyncIterator, Iterable, Mapping, Optional, Tuple, Final
+
+import aiohttp
 import requests
-from typing import Dict, Any, Optional
+from requests.adapters import HTTPAdapter
+
 from .base_agent import BaseAgent
+from ..config import COMMON_CURRENCIES
+
+_COMMON_CURRENCIES = MappingProxyType(COMMON_CURRENCIES)
+
+# How long a fetched rates table is reused before hitting the API again
+_RATES_TTL_SECONDS = 300
+
+# Most source currencies whose rates tables are kept, least recently used
+# evicted first
+_RATES_CACHE_SIZE = 32
+
+# Source currencies fetched in the background when a session starts
+_PREWARM_CURRENCIES = ("USD", "EUR", "BRL")
+
+# Keep-alive HTTP session shared by all CambioAgent instances
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+
+# aiohttp sessions for the async path, one per event loop since a session
+# is tied to its loop: {loop: (session, closer)}. An entry is removed when
+# its loop shuts down.
+_AIOHTTP_SESSIONS: Dict[asyncio.AbstractEventLoop, Tuple[aiohttp.ClientSession, AsyncIterator[None]]] = {}
+
+
+async def _close_with_loop(
+    loop: asyncio.AbstractEventLoop, session: aiohttp.ClientSession
+) -> AsyncIterator[None]:
+    """
+    Keep a session open for the lifetime of the running loop.
+
+    Started once and left suspended; loop.shutdown_asyncgens (called by
+    asyncio.run before closing the loop) finalizes it, which closes the
+    session while the loop can still close its connections and drops the
+    loop's entry from _AIOHTTP_SESSIONS.
+    """
+    try:
+        yield
+    finally:
+        try:
+            await session.close()
+        finally:
+            if _AIOHTTP_SESSIONS.get(loop, (None,))[0] is session:
+                del _AIOHTTP_SESSIONS[loop]
+
+
+async def _get_aiohttp_session() -> aiohttp.ClientSession:
+    """Get the shared aiohttp session, creating one for the running loop."""
+    loop = asyncio.get_running_loop()
+    entry = _AIOHTTP_SESSIONS.get(loop)
+    if entry is None or entry[0].closed:
+        # Forget loops closed without shutting down their async generators
+        for other in [other for other in _AIOHTTP_SESSIONS if other.is_closed()]:
+            del _AIOHTTP_SESSIONS[other]
+        session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=5))
+        closer = _close_with_loop(loop, session)
+        await closer.__anext__()
+        # The loop only tracks async generators weakly, so keep a reference
+        entry = _AIOHTTP_SESSIONS[loop] = (session, closer)
+    return entry[0]
+
+
+@lru_cache(maxsize=256)
+def _format_quote(from_curr: str, to_curr: str, rate: float, timestamp: Any, source: str) -> str:
+    """Format one quotation; repeated quotes of the same rate reuse the text."""
+    return (
+        f"A cotação atual é:\n"
+        f"1 {from_curr} = {rate:.2f} {to_curr}\n"
+        f"Fonte: {source}\n"
+        f"Última atualização: {timestamp}\n"
+        f"Obrigado por usar o Banco Ágil!"
+    )
+
+
+_CAMBIO_SYSTEM_PROMPT: Final[str] = """Você é um agente de câmbio do Banco Ágil. Seu objetivo é:
+1. Consultar cotações de moedas em tempo real
+2. Apresentar a cotação atual de forma clara
+3. Fornecer informações úteis sobre câmbio
+4. Encerrar o atendimento de forma amigável
+
+Mantenha um tom profissional e informativo. Sempre cite a fonte e hora da cotação."""
 
 
 class CambioAgent(BaseAgent):
     """Agent responsible for currency exchange operations."""
 
+    # Rates tables per source currency shared by all instances, in LRU
+    # order: {from_currency: (fetched_at, response_json)}
+    _rates_cache: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+    _rates_lock = threading.Lock()
+
     def __init__(self):
         """Initialize the Câmbio Agent."""
         super().__init__("Câmbio Agent")
@@ -20,13 +115,7 @@ class CambioAgent(BaseAgent):
 
     def get_system_prompt(self) -> str:
         """Get the system prompt for the Câmbio Agent."""
-        return """Você é um agente de câmbio do Banco Ágil. Seu objetivo é:
-1. Consultar cotações de moedas em tempo real
-2. Apresentar a cotação atual de forma clara
-3. Fornecer informações úteis sobre câmbio
-4. Encerrar o atendimento de forma amigável
-
-Mantenha um tom profissional e informativo. Sempre cite a fonte e hora da cotação."""
+        return _CAMBIO_SYSTEM_PROMPT
 
     def get_exchange_rate(self, from_currency: str = "USD", to_currency: str = "BRL") -> Optional[Dict[str, Any]]:
         """
@@ -39,26 +128,139 @@ Mantenha um tom profissional e informativo. Sempre cite a fonte e hora da cotaç
         Returns:
             Dictionary with exchange rate information or None if failed
         """
+        data = self._get_cached_rates(from_currency)
+        if data is None:
+            data = self._fetch_rates(from_currency)
+
+        if data is None:
+            return None
+        return self._build_rate_info(data, from_currency, to_currency)
+
+    @staticmethod
+    def _fetch_rates(from_currency: str) -> Optional[Dict[str, Any]]:
+        """
+        Fetch and cache the rates table for a source currency.
+
+        Args:
+            from_currency: Source currency code
+
+        Returns:
+            Decoded API response, or None if the request failed
+        """
         try:
             # Try using a free API (Open Exchange Rates, Fixer.io, or ExchangeRate-API)
             # Using exchangerate-api.com free tier
             url = f"https://api.exchangerate-api.com/v4/latest/{from_currency}"
-            response = requests.get(url, timeout=5)
+            response = _SESSION.get(url, timeout=5)
 
             if response.status_code == 200:
                 data = response.json()
-                if to_currency in data.get("rates", {}):
-                    rate = data["rates"][to_currency]
-                    return {
-                        "from": from_currency,
-                        "to": to_currency,
-                        "rate": rate,
-                        "timestamp": data.get("time_last_updated", "N/A"),
-                        "source": "exchangerate-api.com",
-                    }
+                CambioAgent._store_rates(from_currency, data)
+                return data
         except requests.exceptions.RequestException as e:
             print(f"Error fetching exchange rate: {str(e)}")
+        return None
+
+    async def get_exchange_rate_async(self, from_currency: str = "USD", to_currency: str = "BRL") -> Optional[Dict[str, Any]]:
+        """
+        Get the current exchange rate without blocking the event loop.
+
+        Args:
+            from_currency: Source currency code (default: USD)
+            to_currency: Target currency code (default: BRL)
+
+        Returns:
+            Dictionary with exchange rate information or None if failed
+        """
+        data = self._get_cached_rates(from_currency)
+        if data is None:
+            try:
+                url = f"https://api.exchangerate-api.com/v4/latest/{from_currency}"
+                session = await _get_aiohttp_session()
+                async with session.get(url) as response:
+                    if response.status == 200:
+                        data = await response.json()
+                        self._store_rates(from_currency, data)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                print(f"Error fetching exchange rate: {str(e)}")
+
+        if data is None:
+            return None
+        return self._build_rate_info(data, from_currency, to_currency)
+
+    @staticmethod
+    def _get_cached_rates(from_currency: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the cached rates table for a source currency if still fresh.
+
+        Args:
+            from_currency: Source currency code
+
+        Returns:
+            Decoded API response, or None if missing or expired
+        """
+        with CambioAgent._rates_lock:
+            entry = CambioAgent._rates_cache.get(from_currency)
+            if entry is None:
+                return None
+            if time.monotonic() - entry[0] >= _RATES_TTL_SECONDS:
+                del CambioAgent._rates_cache[from_currency]
+                return None
+            CambioAgent._rates_cache.move_to_end(from_currency)
+            return entry[1]
+
+    @staticmethod
+    def _store_rates(from_currency: str, data: Dict[str, Any]):
+        """
+        Cache the rates table fetched for a source currency.
+
+        Args:
+            from_currency: Source currency code
+            data: Decoded API response
+        """
+        with CambioAgent._rates_lock:
+            CambioAgent._rates_cache[from_currency] = (time.monotonic(), data)
+            CambioAgent._rates_cache.move_to_end(from_currency)
+            if len(CambioAgent._rates_cache) > _RATES_CACHE_SIZE:
+                CambioAgent._rates_cache.popitem(last=False)
+
+    @staticmethod
+    def prewarm_exchange_rates(currencies: Iterable[str] = _PREWARM_CURRENCIES):
+        """
+        Fetch the rates tables for the most common currencies in the background.
 
+        Args:
+            currencies: Source currency codes to fetch
+        """
+        def prewarm():
+            for currency in currencies:
+                if CambioAgent._get_cached_rates(currency) is None:
+                    CambioAgent._fetch_rates(currency)
+
+        threading.Thread(target=prewarm, name="fx-prewarm", daemon=True).start()
+
+    @staticmethod
+    def _build_rate_info(data: Dict[str, Any], from_currency: str, to_currency: str) -> Optional[Dict[str, Any]]:
+        """
+        Extract one exchange rate from an exchangerate-api.com response.
+
+        Args:
+            data: Decoded JSON response for the source currency
+            from_currency: Source currency code
+            to_currency: Target currency code
+
+        Returns:
+            Dictionary with exchange rate information or None if not available
+        """
+        if to_currency in data.get("rates", {}):
+            rate = data["rates"][to_currency]
+            return {
+                "from": from_currency,
+                "to": to_currency,
+                "rate": rate,
+                "timestamp": data.get("time_last_updated", "N/A"),
+                "source": "exchangerate-api.com",
+            }
         return None
 
     def format_exchange_response(self, exchange_data: Dict[str, Any]) -> str:
@@ -74,36 +276,19 @@ Mantenha um tom profissional e informativo. Sempre cite a fonte e hora da cotaç
         if not exchange_data:
             return "Desculpe, não consegui obter a cotação no momento. Tente novamente mais tarde."
 
-        from_curr = exchange_data.get("from", "")
-        to_curr = exchange_data.get("to", "")
-        rate = exchange_data.get("rate", 0)
-        timestamp = exchange_data.get("timestamp", "N/A")
-        source = exchange_data.get("source", "fonte externa")
-
-        return (
-            f"A cotação atual é:\n"
-            f"1 {from_curr} = {rate:.2f} {to_curr}\n"
-            f"Fonte: {source}\n"
-            f"Última atualização: {timestamp}\n"
-            f"Obrigado por usar o Banco Ágil!"
+        return _format_quote(
+            exchange_data.get("from", ""),
+            exchange_data.get("to", ""),
+            exchange_data.get("rate", 0),
+            exchange_data.get("timestamp", "N/A"),
+            exchange_data.get("source", "fonte externa"),
         )
 
-    def get_common_currencies(self) -> Dict[str, str]:
+    def get_common_currencies(self) -> Mapping[str, str]:
         """
         Get a dictionary of common currency codes and names.
 
         Returns:
-            Dictionary mapping currency codes to names
-        """
-        return {
-            "USD": "Dólar Americano",
-            "EUR": "Euro",
-            "GBP": "Libra Esterlina",
-            "JPY": "Iene Japonês",
-            "AUD": "Dólar Australiano",
-            "CAD": "Dólar Canadense",
-            "CHF": "Franco Suíço",
-            "CNY": "Yuan Chinês",
-            "INR": "Rúpia Indiana",
-            "BRL": "Real Brasileiro",
-        }
+            Read-only mapping of currency codes to names
+        """
+        return _COMMON_CURRENCIES
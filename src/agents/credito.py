@@ -6,14 +6,32 @@ This agent handles credit inquiries and increase requests.
 
 import os
 import csv
+from bisect import bisect_right
 from datetime import datetime, timezone
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple, Final
 from .base_agent import BaseAgent
 
+_UTC = timezone.utc
+
+_CREDITO_SYSTEM_PROMPT: Final[str] = """Você é um agente de crédito do Banco Ágil. Seu objetivo é:
+1. Consultar e informar o limite de crédito disponível do cliente
+2. Processar solicitações de aumento de limite
+3. Validar a solicitação contra o score e tabela de limites
+4. Se rejeitado, oferecer redirecionamento para entrevista de crédito
+5. Manter o cliente informado sobre o status de sua solicitação
+
+Mantenha um tom profissional e confiante. Sempre explique as decisões de aprovação ou rejeição."""
+
 
 class CreditoAgent(BaseAgent):
     """Agent responsible for credit management."""
 
+    # Parsed score_limite.csv shared by all instances, keyed by file mtime,
+    # plus the same bands as parallel (mins, maxs, limits) lists for bisect
+    _SCORE_LIMITS_CACHE: Optional[List[Tuple[int, int, float]]] = None
+    _SCORE_LIMITS_MTIME: Optional[float] = None
+    _SCORE_BANDS: Tuple[List[int], List[int], List[float]] = ([], [], [])
+
     def __init__(self):
         """Initialize the Crédito Agent."""
         super().__init__("Crédito Agent")
@@ -24,17 +42,11 @@ class CreditoAgent(BaseAgent):
         self.requests_file = os.path.join(
             self.data_dir, "solicitacoes_aumento_limite.csv"
         )
+        self._require_files(self.clients_file, self.score_limite_file)
 
     def get_system_prompt(self) -> str:
         """Get the system prompt for the Crédito Agent."""
-        return """Você é um agente de crédito do Banco Ágil. Seu objetivo é:
-1. Consultar e informar o limite de crédito disponível do cliente
-2. Processar solicitações de aumento de limite
-3. Validar a solicitação contra o score e tabela de limites
-4. Se rejeitado, oferecer redirecionamento para entrevista de crédito
-5. Manter o cliente informado sobre o status de sua solicitação
-
-Mantenha um tom profissional e confiante. Sempre explique as decisões de aprovação ou rejeição."""
+        return _CREDITO_SYSTEM_PROMPT
 
     def set_client(self, client_data: Dict[str, Any]):
         """
@@ -64,25 +76,42 @@ Mantenha um tom profissional e confiante. Sempre explique as decisões de aprova
         except Exception as e:
             return f"Erro ao obter limite de crédito: {str(e)}"
 
-    def get_score_limits(self) -> Dict[str, Any]:
+    def get_score_limits(self) -> List[Tuple[int, int, float]]:
         """
         Get the score limits from the score_limite.csv file.
 
+        The parsed table is cached on the class and only re-read when the
+        file's modification time changes.
+
         Returns:
-            Dictionary mapping scores to maximum limits
+            List of (min_score, max_score, max_limit) tuples sorted by min_score
         """
         try:
-            limits = {}
-            data = self.read_csv(self.score_limite_file)
-            for row in data:
-                min_score = int(row["score_minimo"])
-                max_score = int(row["score_maximo"])
-                max_limit = float(row["limite_maximo"])
-                limits[(min_score, max_score)] = max_limit
-            return limits
+            mtime = os.path.getmtime(self.score_limite_file)
+            if (
+                CreditoAgent._SCORE_LIMITS_CACHE is None
+                or CreditoAgent._SCORE_LIMITS_MTIME != mtime
+            ):
+                data = self.read_csv(self.score_limite_file)
+                bands = sorted(
+                    (
+                        int(row["score_minimo"]),
+                        int(row["score_maximo"]),
+                        float(row["limite_maximo"]),
+                    )
+                    for row in data
+                )
+                CreditoAgent._SCORE_LIMITS_CACHE = bands
+                CreditoAgent._SCORE_BANDS = (
+                    [band[0] for band in bands],
+                    [band[1] for band in bands],
+                    [band[2] for band in bands],
+                )
+                CreditoAgent._SCORE_LIMITS_MTIME = mtime
+            return CreditoAgent._SCORE_LIMITS_CACHE
         except Exception as e:
             print(f"Error reading score limits: {str(e)}")
-            return {}
+            return []
 
     def check_limit_approval(self, requested_limit: float) -> tuple[bool, str]:
         """
@@ -99,14 +128,16 @@ Mantenha um tom profissional e confiante. Sempre explique as decisões de aprova
 
         try:
             current_score = float(self.client_data.get("score_credito", 0))
-            score_limits = self.get_score_limits()
+            if self.get_score_limits():
+                mins, maxs, limits = CreditoAgent._SCORE_BANDS
+            else:
+                mins, maxs, limits = [], [], []
 
-            # Find the appropriate limit for the client's score
+            # Find the band whose min_score is the last one <= current score
             max_allowed_limit = None
-            for (min_score, max_score), limit in score_limits.items():
-                if min_score <= current_score <= max_score:
-                    max_allowed_limit = limit
-                    break
+            index = bisect_right(mins, current_score) - 1
+            if index >= 0 and current_score <= maxs[index]:
+                max_allowed_limit = limits[index]
 
             if max_allowed_limit is None:
                 return False, f"Score inválido: {current_score}"
@@ -146,7 +177,7 @@ Mantenha um tom profissional e confiante. Sempre explique as decisões de aprova
             # Create request record
             request_record = {
                 "cpf_cliente": cpf,
-                "data_hora_solicitacao": datetime.now(timezone.utc).isoformat(),
+                "data_hora_solicitacao": datetime.now(_UTC).isoformat(timespec="seconds"),
                 "limite_atual": str(current_limit),
                 "novo_limite_solicitado": str(requested_limit),
                 "status_pedido": status,
@@ -176,16 +207,16 @@ Mantenha um tom profissional e confiante. Sempre explique as decisões de aprova
             cpf: Client's CPF
             new_limit: New credit limit
         """
+        # Nothing to write if the limit did not change
+        if (
+            self.client_data
+            and self.client_data.get("cpf") == cpf
+            and self.client_data.get("limite_credito") == str(new_limit)
+        ):
+            return
+
         try:
-            clients = self.read_csv(self.clients_file)
-            for client in clients:
-                if client["cpf"] == cpf:
-                    client["limite_credito"] = str(new_limit)
-                    break
-
-            # Write back to file
-            headers = list(clients[0].keys()) if clients else []
-            self.write_csv(self.clients_file, clients, headers)
+            self.update_client(self.clients_file, cpf, "limite_credito", new_limit)
         except Exception as e:
             print(f"Error updating client limit: {str(e)}")
 
@@ -5,8 +5,60 @@ This agent conducts financial interviews and recalculates credit scores.
 """
 
 import os
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Final
+
+import numpy as np
+
 from .base_agent import BaseAgent
+from ..config import (
+    PESO_RENDA,
+    PESO_EMPREGO,
+    PESO_DEPENDENTES,
+    PESO_DIVIDAS,
+    MIN_SCORE,
+    MAX_SCORE,
+)
+
+# Score weights from config laid out for vectorized lookups. Each array has
+# a final zero slot used for unrecognized answers.
+_EMPREGO_INDEX = {tipo: i for i, tipo in enumerate(PESO_EMPREGO)}
+_PESO_EMPREGO = np.array([*PESO_EMPREGO.values(), 0])
+_PESO_DEPENDENTES = np.array(
+    [
+        PESO_DEPENDENTES[0],
+        PESO_DEPENDENTES[1],
+        PESO_DEPENDENTES[2],
+        PESO_DEPENDENTES["3+"],
+        0,
+    ]
+)
+_DIVIDAS_INDEX = {dividas: i for i, dividas in enumerate(PESO_DIVIDAS)}
+_PESO_DIVIDAS = np.array([*PESO_DIVIDAS.values(), 0])
+
+# One bit per interview field, used to track completeness
+_FIELD_BITS = {
+    "renda_mensal": 1,
+    "tipo_emprego": 2,
+    "despesas_fixas": 4,
+    "numero_dependentes": 8,
+    "dividas_ativas": 16,
+}
+_ALL_FIELDS_MASK = 31
+
+
+_ENTREVISTA_SYSTEM_PROMPT: Final[str] = """Você é um agente de entrevista de crédito do Banco Ágil. Seu objetivo é:
+1. Conduzir uma entrevista conversacional estruturada
+2. Coletar dados financeiros do cliente:
+   - Renda mensal
+   - Tipo de emprego (formal, autônomo, desempregado)
+   - Despesas fixas mensais
+   - Número de dependentes
+   - Existência de dívidas ativas
+3. Calcular um novo score de crédito
+4. Atualizar o score na base de dados
+5. Redirecionar o cliente de volta ao agente de crédito
+
+Mantenha um tom empático e compreensivo. Explique a importância dos dados coletados."""
 
 
 class EntrevistaCreditoAgent(BaseAgent):
@@ -23,25 +75,15 @@ class EntrevistaCreditoAgent(BaseAgent):
             "numero_dependentes": None,
             "dividas_ativas": None,
         }
+        self._filled_mask = 0
         self.clients_file = os.path.join(
             os.path.dirname(__file__), "..", "data", "clientes.csv"
         )
+        self._require_files(self.clients_file)
 
     def get_system_prompt(self) -> str:
         """Get the system prompt for the Entrevista Crédito Agent."""
-        return """Você é um agente de entrevista de crédito do Banco Ágil. Seu objetivo é:
-1. Conduzir uma entrevista conversacional estruturada
-2. Coletar dados financeiros do cliente:
-   - Renda mensal
-   - Tipo de emprego (formal, autônomo, desempregado)
-   - Despesas fixas mensais
-   - Número de dependentes
-   - Existência de dívidas ativas
-3. Calcular um novo score de crédito
-4. Atualizar o score na base de dados
-5. Redirecionar o cliente de volta ao agente de crédito
-
-Mantenha um tom empático e compreensivo. Explique a importância dos dados coletados."""
+        return _ENTREVISTA_SYSTEM_PROMPT
 
     def set_client(self, client_data: Dict[str, Any]):
         """
@@ -62,6 +104,7 @@ Mantenha um tom empático e compreensivo. Explique a importância dos dados cole
             "numero_dependentes": None,
             "dividas_ativas": None,
         }
+        self._filled_mask = 0
 
     def set_interview_data(self, key: str, value: Any):
         """
@@ -73,10 +116,14 @@ Mantenha um tom empático e compreensivo. Explique a importância dos dados cole
         """
         if key in self.interview_data:
             self.interview_data[key] = value
+            if value is not None:
+                self._filled_mask |= _FIELD_BITS[key]
+            else:
+                self._filled_mask &= ~_FIELD_BITS[key]
 
     def is_interview_complete(self) -> bool:
         """Check if all required interview data has been collected."""
-        return all(v is not None for v in self.interview_data.values())
+        return self._filled_mask == _ALL_FIELDS_MASK
 
     def calculate_new_score(self) -> int:
         """
@@ -89,47 +136,72 @@ Mantenha um tom empático e compreensivo. Explique a importância dos dados cole
             return None
 
         try:
-            # Weights
-            peso_renda = 30
-            peso_emprego = {"formal": 300, "autônomo": 200, "desempregado": 0}
-            peso_dependentes = {0: 100, 1: 80, 2: 60, "3+": 30}
-            peso_dividas = {"sim": -100, "não": 100}
-
-            # Extract data
-            renda_mensal = float(self.interview_data["renda_mensal"])
-            tipo_emprego = self.interview_data["tipo_emprego"].lower()
-            despesas_fixas = float(self.interview_data["despesas_fixas"])
-            numero_dependentes = int(self.interview_data["numero_dependentes"])
-            dividas_ativas = self.interview_data["dividas_ativas"].lower()
-
-            # Normalize dependents to string key if needed
-            dependentes_key = (
-                "3+" if numero_dependentes >= 3 else numero_dependentes
-            )
-
-            # Calculate score components
-            renda_component = (
-                (renda_mensal / (despesas_fixas + 1)) * peso_renda
-            )
-            emprego_component = peso_emprego.get(tipo_emprego, 0)
-            dependentes_component = peso_dependentes.get(dependentes_key, 0)
-            dividas_component = peso_dividas.get(dividas_ativas, 0)
-
-            # Total score
-            total_score = (
-                renda_component
-                + emprego_component
-                + dependentes_component
-                + dividas_component
-            )
-
-            # Clamp between 0 and 1000
-            new_score = max(0, min(1000, int(total_score)))
-            return new_score
+            return int(self.calculate_new_scores_batch([self.interview_data])[0])
         except Exception as e:
             print(f"Error calculating score: {str(e)}")
             return None
 
+    @staticmethod
+    def calculate_new_scores_batch(interviews: List[Dict[str, Any]]) -> np.ndarray:
+        """
+        Calculate credit scores for many completed interviews at once.
+
+        Args:
+            interviews: Interview data dictionaries (same keys as interview_data)
+
+        Returns:
+            Array with one score (0-1000) per interview
+
+        Raises:
+            ValueError: If any interview yields a NaN or infinite score
+        """
+        # Extract data
+        renda_mensal = np.array(
+            [float(i["renda_mensal"]) for i in interviews], dtype=np.float64
+        )
+        despesas_fixas = np.array(
+            [float(i["despesas_fixas"]) for i in interviews], dtype=np.float64
+        )
+        numero_dependentes = np.array(
+            [int(i["numero_dependentes"]) for i in interviews], dtype=np.int64
+        )
+        emprego_idx = np.array(
+            [
+                _EMPREGO_INDEX.get(i["tipo_emprego"].lower(), len(_EMPREGO_INDEX))
+                for i in interviews
+            ],
+            dtype=np.intp,
+        )
+        dividas_idx = np.array(
+            [
+                _DIVIDAS_INDEX.get(i["dividas_ativas"].lower(), len(_DIVIDAS_INDEX))
+                for i in interviews
+            ],
+            dtype=np.intp,
+        )
+
+        # Three or more dependents share one weight; negative counts get none
+        dependentes_idx = np.where(
+            numero_dependentes < 0, 4, np.minimum(numero_dependentes, 3)
+        )
+
+        # Calculate score components
+        with np.errstate(divide="raise", invalid="raise"):
+            renda_component = (renda_mensal / (despesas_fixas + 1)) * PESO_RENDA
+        total_score = (
+            renda_component
+            + np.take(_PESO_EMPREGO, emprego_idx)
+            + np.take(_PESO_DEPENDENTES, dependentes_idx)
+            + np.take(_PESO_DIVIDAS, dividas_idx)
+        )
+
+        # NaN or infinite input has no meaningful score; int() rejected it before
+        if not np.isfinite(total_score).all():
+            raise ValueError("Interview data produced a non-finite score")
+
+        # Clamp between MIN_SCORE and MAX_SCORE
+        return np.clip(total_score, MIN_SCORE, MAX_SCORE).astype(np.int32)
+
     def update_client_score(self, new_score: int) -> bool:
         """
         Update the client's score in the database.
@@ -143,18 +215,13 @@ Mantenha um tom empático e compreensivo. Explique a importância dos dados cole
         if not self.client_data:
             return False
 
+        # Nothing to write if the score did not change
+        if str(new_score) == self.client_data.get("score_credito"):
+            return True
+
         try:
             cpf = self.client_data.get("cpf", "")
-            clients = self.read_csv(self.clients_file)
-
-            for client in clients:
-                if client["cpf"] == cpf:
-                    client["score_credito"] = str(new_score)
-                    break
-
-            # Write back to file
-            headers = list(clients[0].keys()) if clients else []
-            self.write_csv(self.clients_file, clients, headers)
+            self.update_client(self.clients_file, cpf, "score_credito", new_score)
 
             # Update local client data
             self.client_data["score_credito"] = str(new_score)
@@ -5,11 +5,24 @@ This agent authenticates clients and directs them to the appropriate agent.
 """
 
 import os
+import asyncio
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Final
 from .base_agent import BaseAgent
 
 
+_TRIAGEM_SYSTEM_PROMPT: Final[str] = """Você é um agente de triagem bancário do Banco Ágil. Seu objetivo é:
+1. Saudar o cliente de maneira amigável e profissional
+2. Solicitar APENAS o CPF do cliente sem pontuações
+3. Solicitar APENAS a data de nascimento do cliente
+4. Validar os dados contra a base de clientes
+5. Se autenticado, identificar o assunto e indicar o próximo agente
+6. Se não autenticado, informar o erro e permitir até 2 novas tentativas
+
+Mantenha um tom respeitoso, objetivo e evite repetições desnecessárias.
+Sempre valide os dados antes de prosseguir."""
+
+
 class TriagemAgent(BaseAgent):
     """Agent responsible for client triage and routing."""
 
@@ -23,19 +36,11 @@ class TriagemAgent(BaseAgent):
         self.clients_file = os.path.join(
             os.path.dirname(__file__), "..", "data", "clientes.csv"
         )
+        self._require_files(self.clients_file)
 
     def get_system_prompt(self) -> str:
         """Get the system prompt for the Triagem Agent."""
-        return """Você é um agente de triagem bancário do Banco Ágil. Seu objetivo é:
-1. Saudar o cliente de maneira amigável e profissional
-2. Solicitar APENAS o CPF do cliente sem pontuações
-3. Solicitar APENAS a data de nascimento do cliente
-4. Validar os dados contra a base de clientes
-5. Se autenticado, identificar o assunto e indicar o próximo agente
-6. Se não autenticado, informar o erro e permitir até 2 novas tentativas
-
-Mantenha um tom respeitoso, objetivo e evite repetições desnecessárias.
-Sempre valide os dados antes de prosseguir."""
+        return _TRIAGEM_SYSTEM_PROMPT
 
     def authenticate_client(self, cpf: str, data_nascimento: str) -> bool:
         """
@@ -49,17 +54,34 @@ Sempre valide os dados antes de prosseguir."""
             True if authentication is successful, False otherwise
         """
         try:
-            clients = self.read_csv(self.clients_file)
-            for client in clients:
-                if client["cpf"] == cpf and client["data_nascimento"] == data_nascimento:
-                    self.client_data = client
-                    self.is_authenticated = True
-                    return True
+            client = self.find_client(self.clients_file, cpf)
+            if client and client["data_nascimento"] == data_nascimento:
+                self.client_data = client
+                self.is_authenticated = True
+                return True
             return False
         except Exception as e:
             print(f"Error authenticating client: {str(e)}")
             return False
 
+    async def authenticate_client_async(self, cpf: str, data_nascimento: str) -> bool:
+        """
+        Authenticate a client without blocking the event loop.
+
+        Lookups served by the warm in-memory index run inline; lookups that
+        have to read the clients file run in a worker thread.
+
+        Args:
+            cpf: Client's CPF (number only, without punctuation)
+            data_nascimento: Client's birth date (YYYY-MM-DD format)
+
+        Returns:
+            True if authentication is successful, False otherwise
+        """
+        if self.is_client_index_warm(self.clients_file):
+            return self.authenticate_client(cpf, data_nascimento)
+        return await asyncio.to_thread(self.authenticate_client, cpf, data_nascimento)
+
     def get_authenticated_client(self) -> Optional[Dict[str, Any]]:
         """Get the authenticated client data."""
         if self.is_authenticated:
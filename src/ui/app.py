@@ -6,41 +6,141 @@ This is the user interface for interacting with the banking agents.
 
 import streamlit as st
 import os
+import math
+import re
 import sys
+import uuid
 from datetime import datetime
+from collections import deque
+from itertools import chain, islice
+from typing import Callable, FrozenSet, Optional
 
-# Add the parent directory (src) to the path so we can import agents
-src_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-sys.path.insert(0, src_path)
+# Add the project root to the path so we can import the src package
+project_root = os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+sys.path.insert(0, project_root)
 
-from agents.triagem import TriagemAgent
-from agents.credito import CreditoAgent
-from agents.entrevista_credito import EntrevistaCreditoAgent
-from agents.cambio import CambioAgent
+from src.agents.triagem import TriagemAgent
+from src.agents.credito import CreditoAgent
+from src.agents.entrevista_credito import EntrevistaCreditoAgent
+from src.agents.cambio import CambioAgent
+from src.config import COMMON_CURRENCIES
+from src.ui import session_store
+from src.ui.stream_buffer import StreamBuffer
+from src.utils import clean_currency
+
+_NUMBER_RE = re.compile(r"\d+\.?\d*")
+_WORD_RE = re.compile(r"\w+")
+
+# Employment type answers; the matching group indexes _EMPREGO_TYPES
+_EMPREGO_RE = re.compile(
+    r"\b(?:(formal)|(aut[oô]nom[oa])|(desempregad[oa]))\b", re.IGNORECASE
+)
+_EMPREGO_TYPES = ("formal", "autônomo", "desempregado")
+
+# Keywords matched against the casefolded words of the user message
+_EXIT_WORDS = frozenset({"sair", "encerrar", "tchau", "finalizar", "adeus"})
+_EXIT_PHRASES = (frozenset({"até", "logo"}), frozenset({"ate", "logo"}))
+_YES_WORDS = frozenset({"sim", "yes", "quero", "gostaria", "pode"})
+_CAMBIO_WORDS = frozenset({
+    "câmbio", "cambio", "cotação", "cotacao", "cotações", "cotacoes",
+    "moeda", "moedas", "dólar", "dolar", "dólares", "dolares", "euro", "euros",
+    "taxa", "taxas", "conversão", "conversao",
+})
+_LIMITE_WORDS = frozenset({"limite", "limites", "consultar"})
+_NOT_LIMITE_WORDS = frozenset({"aumentar", "aumento"})
+_AUMENTO_WORDS = frozenset({"aumentar", "aumento", "aumente", "solicitar"})
+_CREDITO_WORDS = frozenset({"limite", "limites", "credito", "crédito"})
+_ENTREVISTA_WORDS = frozenset({"entrevista", "score"})
+
+# Drop CPF punctuation; drop thousands separators and use a decimal dot
+_CPF_PUNCTUATION = str.maketrans("", "", "-.")
+_DECIMAL_COMMA = str.maketrans({".": None, ",": "."})
+
+# Messages rendered directly in the chat; older ones go in an expander
+_VISIBLE_MESSAGES = 30
+
+# Messages kept per session, oldest dropped first
+_MAX_MESSAGES = 200
+
+# Minimum time between UI updates while a response streams in (20 Hz)
+_STREAM_INTERVAL_MS = 50
+
+# Currency codes in config order, so the first code found in a message wins
+_CURRENCY_CODES = tuple(COMMON_CURRENCIES)
+
+# Agent classes by the names used in current_agent
+_AGENT_CLASSES = {
+    "triagem": TriagemAgent,
+    "credito": CreditoAgent,
+    "entrevista": EntrevistaCreditoAgent,
+    "cambio": CambioAgent,
+}
+
+# Session state checkpointed to disk after every message; authentication is
+# never saved, so a restored session starts again from the CPF
+_PERSISTED_KEYS = ("messages", "waiting_for")
+
+# Fixed replies for invalid input, sent without a model round-trip
+_ERR_CPF = "CPF inválido. Por favor, informe os 11 dígitos do seu CPF."
+_ERR_DOB = "Data inválida. Por favor, informe sua data de nascimento no formato YYYY-MM-DD (ex: 1990-01-15)."
+_ERR_AUTH = "Não foi possível autenticar com esses dados. Você tem {attempts_left} tentativa(s) restante(s). Por favor, informe seu CPF novamente."
+_ERR_LIMIT_VALUE = "Valor inválido. Por favor, informe um valor positivo em reais (ex: 8000 ou 8.000)."
+_ERR_CURRENCY = "Moeda não reconhecida. Por favor, escolha uma destas: USD, EUR, GBP, JPY, AUD, CAD, CHF, CNY, INR, BRL."
+_ERR_RENDA = "Valor inválido. Por favor, informe sua renda mensal em reais (ex: 5000 ou 5.000,00)."
+_ERR_EMPREGO = "Tipo de emprego não reconhecido. Por favor, responda formal, autônomo ou desempregado."
+_ERR_DESPESAS = "Valor inválido. Por favor, informe suas despesas fixas mensais em reais (ex: 2000 ou 2.000,00)."
+_ERR_DEPENDENTES = "Valor inválido. Por favor, informe o número de dependentes (ex: 0, 1, 2)."
+_ERR_DIVIDAS = "Resposta não reconhecida. Você possui dívidas ativas? Responda sim ou não."
+_MSG_REAUTH = "Sua conversa foi retomada. Por segurança, informe novamente seu CPF para continuar."
+
+# Stands in for birth dates typed by the user in saved sessions
+_REDACTED_DOB = "••••-••-••"
+
+GREETING_PROMPT = (
+    "Faça uma saudação inicial amigável e bem-vinda ao cliente do Banco Ágil."
+)
+
+
+@st.cache_resource
+def get_greeting_cache() -> dict:
+    """Get the greetings already generated, shared by all sessions."""
+    return {}
+
+
+@st.cache_resource
+def warm_up_shared_resources():
+    """
+    Load the score table once per process.
+
+    The table lives at class level in CreditoAgent; loading it here keeps
+    the first credit request of the first session from paying for it.
+    """
+    CreditoAgent().get_score_limits()
 
 
 def initialize_session_state():
     """Initialize Streamlit session state variables."""
-    if "triagem_agent" not in st.session_state:
-        st.session_state.triagem_agent = TriagemAgent()
-    if "credito_agent" not in st.session_state:
-        st.session_state.credito_agent = CreditoAgent()
-    if "entrevista_agent" not in st.session_state:
-        st.session_state.entrevista_agent = EntrevistaCreditoAgent()
-    if "cambio_agent" not in st.session_state:
-        st.session_state.cambio_agent = CambioAgent()
+    warm_up_shared_resources()
+    # Only the triagem agent is needed up front; the others are built by
+    # get_agent the first time the conversation reaches them
+    get_agent("triagem")
 
     if "current_agent" not in st.session_state:
         st.session_state.current_agent = "triagem"
     if "authenticated_client" not in st.session_state:
         st.session_state.authenticated_client = None
-    if "messages" not in st.session_state:
-        st.session_state.messages = []
-        # Add initial greeting
-        greeting = st.session_state.triagem_agent.send_message(
-            "Faça uma saudação inicial amigável e bem-vinda ao cliente do Banco Ágil."
-        )
-        st.session_state.messages.append({"role": "assistant", "content": greeting})
+    if "messages" not in st.session_state and not restore_session():
+        st.session_state.messages = deque(maxlen=_MAX_MESSAGES)
+        # Rates expire, so fetch them again for every new session
+        CambioAgent.prewarm_exchange_rates()
+        # Add initial greeting, streamed in main() the first time it is needed
+        greeting = get_greeting_cache().get(GREETING_PROMPT)
+        if greeting is not None:
+            st.session_state.messages.append({"role": "assistant", "content": greeting})
+        else:
+            st.session_state.pending_greeting = True
     if "waiting_for" not in st.session_state:
         st.session_state.waiting_for = "cpf"
     if "temp_cpf" not in st.session_state:
@@ -51,17 +151,104 @@ def initialize_session_state():
         st.session_state.last_agent_question = None
 
 
+def get_session_id() -> str:
+    """Get the session id kept in the page URL, creating one if needed."""
+    session_id = st.query_params.get("sid")
+    if not session_store.is_valid_session_id(session_id):
+        session_id = uuid.uuid4().hex
+        st.query_params["sid"] = session_id
+    return session_id
+
+
+def save_session():
+    """Checkpoint the conversation state so it survives reloads and restarts."""
+    state = {key: st.session_state[key] for key in _PERSISTED_KEYS if key in st.session_state}
+    # Birth dates are login credentials and never written to disk
+    state["messages"] = [
+        {"role": message["role"], "content": _REDACTED_DOB} if message.get("sensitive") else message
+        for message in state["messages"]
+    ]
+    state["authentication_attempts"] = get_agent("triagem").authentication_attempts
+    session_store.save_session(get_session_id(), state)
+
+
+def restore_session() -> bool:
+    """
+    Restore the conversation saved for this session id, logged out.
+
+    Returns:
+        True if a saved session was restored, False otherwise
+    """
+    session_store.purge_expired_sessions()
+    state = session_store.load_session(get_session_id())
+    if state is None:
+        return False
+
+    # Only the transcript comes back: anyone holding the URL has the session
+    # id, so the client must authenticate again before reaching their data
+    st.session_state.messages = deque(state["messages"], maxlen=_MAX_MESSAGES)
+    get_agent("triagem").authentication_attempts = state.get("authentication_attempts", 0)
+    waiting_for = state.get("waiting_for")
+    if waiting_for == "finished":
+        st.session_state.waiting_for = "finished"
+    else:
+        st.session_state.waiting_for = "cpf"
+        if waiting_for != "cpf":
+            st.session_state.messages.append({"role": "assistant", "content": _MSG_REAUTH})
+    return True
+
+
+def end_session():
+    """Discard the conversation state, in memory and on disk."""
+    session_store.delete_session(get_session_id())
+    st.session_state.clear()
+
+
+def format_message(message: dict) -> str:
+    """Format a chat message as Markdown."""
+    if message["role"] == "user":
+        return f"**👤 Você:** {message['content']}"
+    return f"**🤖 Agente:** {message['content']}"
+
+
+def update_client_display():
+    """Format the authenticated client's sidebar details after they change."""
+    client = st.session_state.authenticated_client
+    cpf = client.get("cpf")
+    st.session_state.client_display = (
+        f"**Nome:** {client.get('nome')}\n\n"
+        f"**CPF:** {cpf[:3]}.***.***-{cpf[-2:]}\n\n"
+        f"**Score:** {client.get('score_credito')}\n\n"
+        f"**Limite:** R$ {float(client.get('limite_credito', 0)):,.2f}"
+    )
+
+
+def get_agent(name: str):
+    """
+    Get one of this session's agents, building it on first use.
+
+    Args:
+        name: Agent name, as used in current_agent
+
+    Returns:
+        The session's agent
+    """
+    key = f"{name}_agent"
+    agent = st.session_state.get(key)
+    if agent is None:
+        agent = _AGENT_CLASSES[name]()
+        client = st.session_state.get("authenticated_client")
+        if client and hasattr(agent, "set_client"):
+            agent.set_client(client)
+        st.session_state[key] = agent
+    return agent
+
+
 def get_current_agent():
     """Get the current active agent."""
-    if st.session_state.current_agent == "triagem":
-        return st.session_state.triagem_agent
-    elif st.session_state.current_agent == "credito":
-        return st.session_state.credito_agent
-    elif st.session_state.current_agent == "entrevista":
-        return st.session_state.entrevista_agent
-    elif st.session_state.current_agent == "cambio":
-        return st.session_state.cambio_agent
-    return st.session_state.triagem_agent
+    if st.session_state.current_agent in _AGENT_CLASSES:
+        return get_agent(st.session_state.current_agent)
+    return get_agent("triagem")
 
 
 def switch_agent(new_agent: str):
@@ -70,375 +257,419 @@ def switch_agent(new_agent: str):
         st.session_state.current_agent = new_agent
 
 
-def process_user_message(user_input: str):
-    """Process user message and generate agent response."""
-    # Add user message to history
-    st.session_state.messages.append({"role": "user", "content": user_input})
-    
+def _handle_cpf(user_input: str) -> str:
+    """Validate the CPF typed by the client and ask for the birth date."""
     agent = get_current_agent()
-    
-    # Handle authentication flow
-    if st.session_state.current_agent == "triagem" and not st.session_state.authenticated_client:
-        if st.session_state.waiting_for == "cpf":
-            # Validate CPF
-            cpf = user_input.replace("-", "").replace(".", "").strip()
-            if len(cpf) == 11 and cpf.isdigit():
-                st.session_state.temp_cpf = cpf
-                st.session_state.waiting_for = "dob"
-                response = agent.send_message(
-                    f"O cliente informou o CPF {cpf}. Peça agora a data de nascimento no formato YYYY-MM-DD."
-                )
-            else:
-                response = agent.send_message(
-                    f"O cliente informou um CPF inválido: '{user_input}'. Explique que o CPF deve ter 11 dígitos e peça novamente."
-                )
-        
-        elif st.session_state.waiting_for == "dob":
-            # Validate date of birth
-            dob = user_input.strip()
-            if len(dob) == 10 and dob.count("-") == 2:
-                # Try to authenticate
-                if agent.authenticate_client(st.session_state.temp_cpf, dob):
-                    client = agent.get_authenticated_client()
-                    st.session_state.authenticated_client = client
-                    st.session_state.credito_agent.set_client(client)
-                    st.session_state.entrevista_agent.set_client(client)
-                    st.session_state.waiting_for = None
-                    response = agent.send_message(
-                        f"Autenticação bem-sucedida! Cliente: {client.get('nome')}. Pergunte como pode ajudar hoje e mencione as opções: consultar limite, aumentar limite, entrevista de crédito ou consultar câmbio."
-                    )
-                else:
-                    agent.increment_attempts()
-                    attempts_left = agent.max_attempts - agent.get_authentication_attempts()
-                    if agent.is_max_attempts_reached():
-                        response = "❌ Falha na autenticação após 3 tentativas. Por segurança, o atendimento foi encerrado. Por favor, entre em contato com a agência."
-                        st.session_state.waiting_for = "finished"
-                    else:
-                        st.session_state.waiting_for = "cpf"
-                        st.session_state.temp_cpf = None
-                        response = agent.send_message(
-                            f"Autenticação falhou. O cliente tem {attempts_left} tentativa(s) restante(s). Peça o CPF novamente de forma educada."
-                        )
-            else:
-                response = agent.send_message(
-                    f"Data inválida: '{user_input}'. Explique que a data deve estar no formato YYYY-MM-DD (ex: 1990-01-15) e peça novamente."
-                )
-    
-    # Handle authenticated user requests
-    elif st.session_state.authenticated_client:
-        user_lower = user_input.lower()
-        
-        # Check if user wants to exit (highest priority)
-        if any(word in user_lower for word in ["sair", "encerrar", "tchau", "obrigado e sair", "finalizar", "até logo", "ate logo", "adeus"]):
-            agent = get_current_agent()
-            response = agent.send_message(
-                "O cliente quer encerrar o atendimento. Agradeça de forma cordial, deseje um ótimo dia e mencione que o Banco Ágil está sempre à disposição."
-            )
-            st.session_state.waiting_for = "finished"
-        
-        # Check if user is answering yes/no to a previous question
-        elif any(word in user_lower for word in ["sim", "yes", "quero", "gostaria", "pode"]) and st.session_state.last_agent_question == "limit_increase_offer":
-            # User confirmed they want to increase limit
-            switch_agent("credito")
-            agent = get_current_agent()
-            st.session_state.waiting_for = "limit_value"
-            st.session_state.last_agent_question = None
-            response = agent.send_message(
-                "O cliente confirmou que quer aumentar o limite. Pergunte qual o novo valor de limite desejado em reais de forma clara e objetiva."
-            )
-        
-        # First check if user is providing a value for limit increase (handles both direct request with value)
-        elif st.session_state.waiting_for == "limit_value":
-            # Extract numeric value from input
-            try:
-                # Remove currency symbols and extract number
-                value_str = user_input.replace("R$", "").replace(".", "").replace(",", ".").strip()
-                # Try to extract just numbers
-                import re
-                numbers = re.findall(r'\d+\.?\d*', value_str)
-                if numbers:
-                    requested_limit = float(numbers[0])
-                else:
-                    raise ValueError("No number found")
-                
-                if requested_limit > 0:
-                    credito_agent = st.session_state.credito_agent
-                    result = credito_agent.create_limit_increase_request(requested_limit)
-                    status = result.get("status", "erro")
-                    mensagem = result.get("mensagem", "")
-                    
-                    if status == "aprovado":
-                        st.session_state.authenticated_client["limite_credito"] = str(requested_limit)
-                        st.session_state.waiting_for = None
-                        st.session_state.last_agent_question = None
-                        st.session_state.current_agent = "credito"
-                        agent = get_current_agent()
-                        response = agent.send_message(
-                            f"Solicitação aprovada! {mensagem}. Informe ao cliente de forma entusiasmada e pergunte se precisa de mais alguma coisa."
-                        )
-                    elif status == "rejeitado":
-                        st.session_state.waiting_for = None
-                        st.session_state.last_agent_question = None
-                        st.session_state.current_agent = "credito"
-                        agent = get_current_agent()
-                        response = agent.send_message(
-                            f"Solicitação rejeitada. {mensagem}. Ofereça realizar uma entrevista de crédito para tentar melhorar o score."
-                        )
-                    else:
-                        st.session_state.waiting_for = None
-                        st.session_state.last_agent_question = None
-                        st.session_state.current_agent = "credito"
-                        agent = get_current_agent()
-                        response = agent.send_message(
-                            f"Erro ao processar solicitação: {mensagem}. Pergunte se deseja tentar novamente."
-                        )
-                else:
-                    agent = get_current_agent()
-                    response = agent.send_message(
-                        "Valor inválido. Peça ao cliente um valor positivo em reais."
-                    )
-            except (ValueError, IndexError):
-                agent = get_current_agent()
-                response = agent.send_message(
-                    f"Não consegui identificar o valor em '{user_input}'. Peça ao cliente para informar apenas o valor numérico em reais (ex: 8000 ou 8.000)."
-                )
-        
-        # Check if waiting for currency input (high priority - before keyword matching)
-        elif st.session_state.waiting_for == "from_currency":
-            agent = get_current_agent()
-            from_curr = user_input.upper().strip()
-            # Extract 3-letter currency code
-            currencies = st.session_state.cambio_agent.get_common_currencies()
-            found_curr = None
-            for code in currencies.keys():
-                if code in from_curr:
-                    found_curr = code
-                    break
-            
-            if found_curr:
-                st.session_state.temp_from_currency = found_curr
-                st.session_state.waiting_for = "to_currency"
-                response = agent.send_message(
-                    f"Entendido, {found_curr}. Pergunte agora para qual moeda deseja converter (BRL, USD, EUR, etc)."
-                )
-            else:
-                response = agent.send_message(
-                    f"Moeda '{user_input}' não reconhecida. Peça uma moeda válida: USD, EUR, GBP, JPY, AUD, CAD, CHF, CNY, INR, BRL."
-                )
-        
-        elif st.session_state.waiting_for == "to_currency":
-            agent = get_current_agent()
-            to_curr = user_input.upper().strip()
-            currencies = st.session_state.cambio_agent.get_common_currencies()
-            found_curr = None
-            for code in currencies.keys():
-                if code in to_curr:
-                    found_curr = code
-                    break
-            
-            if found_curr:
-                from_curr = st.session_state.temp_from_currency
-                exchange_data = st.session_state.cambio_agent.get_exchange_rate(from_curr, found_curr)
-                formatted_response = st.session_state.cambio_agent.format_exchange_response(exchange_data)
-                st.session_state.waiting_for = None
-                st.session_state.last_agent_question = None
-                st.session_state.current_agent = "cambio"
-                agent = get_current_agent()
-                response = agent.send_message(
-                    f"Consulta de {from_curr} para {found_curr}. Informe: {formatted_response}. Pergunte se deseja outra consulta ou algo mais."
-                )
-            else:
-                response = agent.send_message(
-                    f"Moeda '{user_input}' não reconhecida. Peça uma moeda válida: USD, EUR, GBP, JPY, AUD, CAD, CHF, CNY, INR, BRL."
-                )
-        
-        # Check for cambio BEFORE credit limit to avoid false matches
-        elif any(word in user_lower for word in ["câmbio", "cambio", "cotação", "cotacao", "moeda", "dolar", "dólar", "euro", "taxa", "taxas", "conversão"]):
-            switch_agent("cambio")
-            agent = get_current_agent()
-            st.session_state.waiting_for = "from_currency"
-            st.session_state.last_agent_question = None
-            response = agent.send_message(
-                "O cliente quer consultar câmbio. Pergunte de qual moeda ele deseja consultar (USD, EUR, GBP, JPY, etc)."
-            )
-        
-        # Check what user wants
-        elif any(word in user_lower for word in ["limite", "consultar", "ver limite", "meu limite"]) and "aumentar" not in user_lower and "aumento" not in user_lower and "câmbio" not in user_lower and "cambio" not in user_lower:
-            switch_agent("credito")
-            agent = get_current_agent()
-            
-            limit_info = agent.get_client_credit_limit()
-            st.session_state.last_agent_question = "limit_increase_offer"
-            response = agent.send_message(
-                f"O cliente quer saber o limite. Informe: {limit_info}. Pergunte de forma clara e direta se deseja solicitar um aumento."
-            )
-        
-        elif any(word in user_lower for word in ["aumentar", "aumento", "solicitar"]) and any(word in user_lower for word in ["limite", "credito", "crédito"]):
-            switch_agent("credito")
-            agent = get_current_agent()
-            
-            # Check if user already provided a value in the same message
-            import re
-            numbers = re.findall(r'\d+\.?\d*', user_input.replace(".", "").replace(",", "."))
-            if numbers and len(numbers) > 0:
-                # User provided value directly, process it
-                try:
-                    requested_limit = float(numbers[0])
-                    if requested_limit > 100:  # Reasonable limit value
-                        st.session_state.waiting_for = "limit_value"
-                        # Process immediately by calling the same logic
-                        result = agent.create_limit_increase_request(requested_limit)
-                        status = result.get("status", "erro")
-                        mensagem = result.get("mensagem", "")
-                        
-                        if status == "aprovado":
-                            st.session_state.authenticated_client["limite_credito"] = str(requested_limit)
-                            st.session_state.waiting_for = None
-                            st.session_state.last_agent_question = None
-                            st.session_state.current_agent = "credito"
-                            agent = get_current_agent()
-                            response = agent.send_message(
-                                f"Solicitação de R$ {requested_limit:.2f} aprovada! {mensagem}. Informe ao cliente de forma entusiasmada e pergunte se precisa de mais alguma coisa."
-                            )
-                        elif status == "rejeitado":
-                            st.session_state.waiting_for = None
-                            st.session_state.last_agent_question = None
-                            st.session_state.current_agent = "credito"
-                            agent = get_current_agent()
-                            response = agent.send_message(
-                                f"Solicitação de R$ {requested_limit:.2f} rejeitada. {mensagem}. Ofereça realizar uma entrevista de crédito para tentar melhorar o score."
-                            )
-                        else:
-                            st.session_state.waiting_for = None
-                            st.session_state.last_agent_question = None
-                            st.session_state.current_agent = "credito"
-                            agent = get_current_agent()
-                            response = agent.send_message(
-                                f"Erro ao processar solicitação: {mensagem}. Pergunte se deseja tentar novamente."
-                            )
-                    else:
-                        raise ValueError("Value too low")
-                except (ValueError, IndexError):
-                    st.session_state.waiting_for = "limit_value"
-                    response = agent.send_message(
-                        "O cliente quer aumentar o limite. Pergunte qual o novo valor de limite desejado em reais."
-                    )
-            else:
-                st.session_state.waiting_for = "limit_value"
-                response = agent.send_message(
-                    "O cliente quer aumentar o limite. Pergunte qual o novo valor de limite desejado em reais."
-                )
-        
-        elif any(word in user_lower for word in ["entrevista", "melhorar score", "score"]):
-            switch_agent("entrevista")
-            agent = get_current_agent()
-            st.session_state.interview_step = 1
-            st.session_state.waiting_for = "interview_renda"
-            response = agent.send_message(
-                "O cliente quer fazer entrevista de crédito. Explique que faremos algumas perguntas financeiras e comece perguntando a renda mensal em reais."
-            )
-        
-        elif st.session_state.current_agent == "entrevista" and "interview" in st.session_state.waiting_for:
-            agent = get_current_agent()
-            
-            if st.session_state.waiting_for == "interview_renda":
-                try:
-                    renda = float(user_input.replace("R$", "").replace(".", "").replace(",", ".").strip())
-                    agent.set_interview_data("renda_mensal", renda)
-                    st.session_state.waiting_for = "interview_emprego"
-                    response = agent.send_message(
-                        "Registrado. Pergunte agora o tipo de emprego: formal, autônomo ou desempregado."
-                    )
-                except ValueError:
-                    response = agent.send_message(
-                        "Valor inválido. Peça a renda mensal em reais novamente."
-                    )
-            
-            elif st.session_state.waiting_for == "interview_emprego":
-                emprego = user_input.lower().strip()
-                if any(tipo in emprego for tipo in ["formal", "autônomo", "autônomo", "desempregado"]):
-                    if "formal" in emprego:
-                        agent.set_interview_data("tipo_emprego", "formal")
-                    elif "autônomo" in emprego or "autônomo" in emprego:
-                        agent.set_interview_data("tipo_emprego", "autônomo")
-                    else:
-                        agent.set_interview_data("tipo_emprego", "desempregado")
-                    st.session_state.waiting_for = "interview_despesas"
-                    response = agent.send_message(
-                        "Anotado. Pergunte agora as despesas fixas mensais em reais."
-                    )
-                else:
-                    response = agent.send_message(
-                        "Tipo de emprego não reconhecido. Peça para escolher: formal, autônomo ou desempregado."
-                    )
-            
-            elif st.session_state.waiting_for == "interview_despesas":
-                try:
-                    despesas = float(user_input.replace("R$", "").replace(".", "").replace(",", ".").strip())
-                    agent.set_interview_data("despesas_fixas", despesas)
-                    st.session_state.waiting_for = "interview_dependentes"
-                    response = agent.send_message(
-                        "Registrado. Pergunte quantos dependentes o cliente possui."
-                    )
-                except ValueError:
-                    response = agent.send_message(
-                        "Valor inválido. Peça as despesas fixas em reais novamente."
-                    )
-            
-            elif st.session_state.waiting_for == "interview_dependentes":
-                try:
-                    dependentes = int(user_input.strip())
-                    agent.set_interview_data("numero_dependentes", dependentes)
-                    st.session_state.waiting_for = "interview_dividas"
-                    response = agent.send_message(
-                        "Anotado. Pergunte se o cliente possui dívidas ativas (sim ou não)."
-                    )
-                except ValueError:
-                    response = agent.send_message(
-                        "Valor inválido. Peça o número de dependentes novamente."
-                    )
-            
-            elif st.session_state.waiting_for == "interview_dividas":
-                dividas = user_input.lower().strip()
-                if "sim" in dividas or "tenho" in dividas or "possuo" in dividas:
-                    agent.set_interview_data("dividas_ativas", "sim")
-                elif "não" in dividas or "nao" in dividas or "n" in dividas:
-                    agent.set_interview_data("dividas_ativas", "não")
-                else:
-                    response = agent.send_message(
-                        "Resposta não reconhecida. Pergunte novamente se possui dívidas ativas (sim ou não)."
-                    )
-                    st.session_state.messages.append({"role": "assistant", "content": response})
-                    return
-                
-                # Finalize interview
-                result = agent.finalize_interview()
-                if result.get("status") == "sucesso":
-                    novo_score = result.get("novo_score")
-                    st.session_state.authenticated_client["score_credito"] = str(novo_score)
-                    st.session_state.waiting_for = None
-                    st.session_state.last_agent_question = None
-                    st.session_state.current_agent = "entrevista"
-                    agent = get_current_agent()
-                    response = agent.send_message(
-                        f"Entrevista finalizada! {result.get('mensagem')}. Agradeça e pergunte se deseja solicitar aumento de limite agora ou fazer outra coisa."
-                    )
-                else:
-                    response = agent.send_message(
-                        f"Erro ao finalizar entrevista: {result.get('mensagem')}"
-                    )
-        
+    cpf = user_input.translate(_CPF_PUNCTUATION).strip()
+    if len(cpf) == 11 and cpf.isdigit():
+        st.session_state.temp_cpf = cpf
+        st.session_state.waiting_for = "dob"
+        return agent.send_message(
+            f"O cliente informou o CPF {cpf}. Peça agora a data de nascimento no formato YYYY-MM-DD."
+        )
+    return _ERR_CPF
+
+
+def _handle_dob(user_input: str) -> str:
+    """Authenticate the client with the CPF given before and this birth date."""
+    agent = get_current_agent()
+    dob = user_input.strip()
+    if not (len(dob) == 10 and dob.count("-") == 2):
+        return _ERR_DOB
+
+    if agent.authenticate_client(st.session_state.temp_cpf, dob):
+        client = agent.get_authenticated_client()
+        st.session_state.authenticated_client = client
+        update_client_display()
+        # Agents already built need the client; the rest get it in get_agent
+        for name in ("credito", "entrevista"):
+            if f"{name}_agent" in st.session_state:
+                st.session_state[f"{name}_agent"].set_client(client)
+        st.session_state.waiting_for = None
+        return agent.send_message(
+            f"Autenticação bem-sucedida! Cliente: {client.get('nome')}. Pergunte como pode ajudar hoje e mencione as opções: consultar limite, aumentar limite, entrevista de crédito ou consultar câmbio."
+        )
+
+    agent.increment_attempts()
+    attempts_left = agent.max_attempts - agent.get_authentication_attempts()
+    if agent.is_max_attempts_reached():
+        st.session_state.waiting_for = "finished"
+        return "❌ Falha na autenticação após 3 tentativas. Por segurança, o atendimento foi encerrado. Por favor, entre em contato com a agência."
+    st.session_state.waiting_for = "cpf"
+    st.session_state.temp_cpf = None
+    return _ERR_AUTH.format(attempts_left=attempts_left)
+
+
+def _handle_not_authenticated(user_input: str) -> str:
+    """Answer any message sent before authentication is complete."""
+    return "Por favor, complete a autenticação primeiro."
+
+
+def _handle_exit(user_input: str) -> str:
+    """End the session."""
+    agent = get_current_agent()
+    st.session_state.waiting_for = "finished"
+    return agent.send_message(
+        "O cliente quer encerrar o atendimento. Agradeça de forma cordial, deseje um ótimo dia e mencione que o Banco Ágil está sempre à disposição."
+    )
+
+
+def _handle_limit_offer_accepted(user_input: str) -> str:
+    """Ask for the new limit after the client accepted the increase offer."""
+    switch_agent("credito")
+    agent = get_current_agent()
+    st.session_state.waiting_for = "limit_value"
+    st.session_state.last_agent_question = None
+    return agent.send_message(
+        "O cliente confirmou que quer aumentar o limite. Pergunte qual o novo valor de limite desejado em reais de forma clara e objetiva."
+    )
+
+
+def _submit_limit_increase(requested_limit: float) -> str:
+    """
+    Submit a limit increase request and report its outcome to the client.
+
+    Args:
+        requested_limit: The new limit requested, in reais
+
+    Returns:
+        The credit agent's response
+    """
+    result = get_agent("credito").create_limit_increase_request(requested_limit)
+    status = result.get("status", "erro")
+    mensagem = result.get("mensagem", "")
+
+    if status == "aprovado":
+        st.session_state.authenticated_client["limite_credito"] = str(requested_limit)
+        update_client_display()
+    st.session_state.waiting_for = None
+    st.session_state.last_agent_question = None
+    switch_agent("credito")
+    agent = get_current_agent()
+
+    if status == "aprovado":
+        return agent.send_message(
+            f"Solicitação de R$ {requested_limit:.2f} aprovada! {mensagem}. Informe ao cliente de forma entusiasmada e pergunte se precisa de mais alguma coisa."
+        )
+    elif status == "rejeitado":
+        return agent.send_message(
+            f"Solicitação de R$ {requested_limit:.2f} rejeitada. {mensagem}. Ofereça realizar uma entrevista de crédito para tentar melhorar o score."
+        )
+    return agent.send_message(
+        f"Erro ao processar solicitação: {mensagem}. Pergunte se deseja tentar novamente."
+    )
+
+
+def _handle_limit_value(user_input: str) -> str:
+    """Submit a limit increase request for the value typed by the client."""
+    try:
+        # Remove currency symbols and extract number
+        value_str = clean_currency(user_input)
+        # Try to extract just numbers
+        numbers = _NUMBER_RE.findall(value_str)
+        if numbers:
+            requested_limit = float(numbers[0])
         else:
-            # General conversation
-            response = agent.send_message(
-                f"O cliente disse: '{user_input}'. Responda de forma educada e pergunte como pode ajudar. Mencione as opções: consultar limite, aumentar limite, entrevista de crédito, consultar câmbio ou sair."
-            )
-    
+            raise ValueError("No number found")
+
+        if requested_limit > 0:
+            return _submit_limit_increase(requested_limit)
+        else:
+            return _ERR_LIMIT_VALUE
+    except (ValueError, IndexError):
+        return _ERR_LIMIT_VALUE
+
+
+def _handle_from_currency(user_input: str) -> str:
+    """Record the source currency and ask for the target one."""
+    agent = get_current_agent()
+    from_curr = user_input.upper().strip()
+    # Extract 3-letter currency code
+    found_curr = next((code for code in _CURRENCY_CODES if code in from_curr), None)
+
+    if found_curr:
+        st.session_state.temp_from_currency = found_curr
+        st.session_state.waiting_for = "to_currency"
+        return agent.send_message(
+            f"Entendido, {found_curr}. Pergunte agora para qual moeda deseja converter (BRL, USD, EUR, etc)."
+        )
+    return _ERR_CURRENCY
+
+
+def _handle_to_currency(user_input: str) -> str:
+    """Look up the exchange rate for the chosen pair of currencies."""
+    to_curr = user_input.upper().strip()
+    found_curr = next((code for code in _CURRENCY_CODES if code in to_curr), None)
+
+    if found_curr:
+        from_curr = st.session_state.temp_from_currency
+        cambio_agent = get_agent("cambio")
+        exchange_data = cambio_agent.get_exchange_rate(from_curr, found_curr)
+        formatted_response = cambio_agent.format_exchange_response(exchange_data)
+        st.session_state.waiting_for = None
+        st.session_state.last_agent_question = None
+        st.session_state.current_agent = "cambio"
+        # The quote is already formatted for the client, so skip the model
+        # round-trip and show it directly, with Markdown line breaks
+        quote = formatted_response.replace("\n", "  \n")
+        return f"{quote}\n\nDeseja fazer outra consulta ou precisa de algo mais?"
+    return _ERR_CURRENCY
+
+
+def _handle_cambio_intent(user_input: str) -> str:
+    """Start a currency quotation."""
+    switch_agent("cambio")
+    agent = get_current_agent()
+    st.session_state.waiting_for = "from_currency"
+    st.session_state.last_agent_question = None
+    return agent.send_message(
+        "O cliente quer consultar câmbio. Pergunte de qual moeda ele deseja consultar (USD, EUR, GBP, JPY, etc)."
+    )
+
+
+def _handle_limite_intent(user_input: str) -> str:
+    """Show the current credit limit and offer an increase."""
+    switch_agent("credito")
+    agent = get_current_agent()
+
+    limit_info = agent.get_client_credit_limit()
+    st.session_state.last_agent_question = "limit_increase_offer"
+    return agent.send_message(
+        f"O cliente quer saber o limite. Informe: {limit_info}. Pergunte de forma clara e direta se deseja solicitar um aumento."
+    )
+
+
+def _handle_aumento_intent(user_input: str) -> str:
+    """Start a limit increase, submitting it at once if a value was given."""
+    switch_agent("credito")
+    agent = get_current_agent()
+
+    # Check if user already provided a value in the same message
+    numbers = _NUMBER_RE.findall(user_input.translate(_DECIMAL_COMMA))
+    if numbers:
+        # User provided value directly, process it
+        requested_limit = float(numbers[0])
+        if requested_limit > 100:  # Reasonable limit value
+            return _submit_limit_increase(requested_limit)
+
+    st.session_state.waiting_for = "limit_value"
+    return agent.send_message(
+        "O cliente quer aumentar o limite. Pergunte qual o novo valor de limite desejado em reais."
+    )
+
+
+def _handle_entrevista_intent(user_input: str) -> str:
+    """Start the credit interview."""
+    switch_agent("entrevista")
+    agent = get_current_agent()
+    st.session_state.interview_step = 1
+    st.session_state.waiting_for = "interview_renda"
+    return agent.send_message(
+        "O cliente quer fazer entrevista de crédito. Explique que faremos algumas perguntas financeiras e comece perguntando a renda mensal em reais."
+    )
+
+
+def _handle_interview_renda(user_input: str) -> str:
+    """Record the monthly income and ask for the employment type."""
+    agent = get_current_agent()
+    try:
+        renda = float(clean_currency(user_input))
+    except ValueError:
+        return _ERR_RENDA
+    if not math.isfinite(renda):
+        return _ERR_RENDA
+    agent.set_interview_data("renda_mensal", renda)
+    st.session_state.waiting_for = "interview_emprego"
+    return agent.send_message(
+        "Registrado. Pergunte agora o tipo de emprego: formal, autônomo ou desempregado."
+    )
+
+
+def _handle_interview_emprego(user_input: str) -> str:
+    """Record the employment type and ask for the fixed expenses."""
+    agent = get_current_agent()
+    match = _EMPREGO_RE.search(user_input)
+    if match:
+        agent.set_interview_data("tipo_emprego", _EMPREGO_TYPES[match.lastindex - 1])
+        st.session_state.waiting_for = "interview_despesas"
+        return agent.send_message(
+            "Anotado. Pergunte agora as despesas fixas mensais em reais."
+        )
+    return _ERR_EMPREGO
+
+
+def _handle_interview_despesas(user_input: str) -> str:
+    """Record the fixed expenses and ask for the number of dependents."""
+    agent = get_current_agent()
+    try:
+        despesas = float(clean_currency(user_input))
+    except ValueError:
+        return _ERR_DESPESAS
+    if not math.isfinite(despesas):
+        return _ERR_DESPESAS
+    agent.set_interview_data("despesas_fixas", despesas)
+    st.session_state.waiting_for = "interview_dependentes"
+    return agent.send_message(
+        "Registrado. Pergunte quantos dependentes o cliente possui."
+    )
+
+
+def _handle_interview_dependentes(user_input: str) -> str:
+    """Record the number of dependents and ask about active debts."""
+    agent = get_current_agent()
+    try:
+        dependentes = int(user_input.strip())
+    except ValueError:
+        return _ERR_DEPENDENTES
+    agent.set_interview_data("numero_dependentes", dependentes)
+    st.session_state.waiting_for = "interview_dividas"
+    return agent.send_message(
+        "Anotado. Pergunte se o cliente possui dívidas ativas (sim ou não)."
+    )
+
+
+def _handle_interview_dividas(user_input: str) -> str:
+    """Record active debts and finish the interview with the new score."""
+    agent = get_current_agent()
+    dividas = user_input.lower().strip()
+    if "sim" in dividas or "tenho" in dividas or "possuo" in dividas:
+        agent.set_interview_data("dividas_ativas", "sim")
+    elif "não" in dividas or "nao" in dividas or "n" in dividas:
+        agent.set_interview_data("dividas_ativas", "não")
     else:
-        response = "Por favor, complete a autenticação primeiro."
-    
+        return _ERR_DIVIDAS
+
+    # Finalize interview
+    result = agent.finalize_interview()
+    if result.get("status") == "sucesso":
+        novo_score = result.get("novo_score")
+        st.session_state.authenticated_client["score_credito"] = str(novo_score)
+        update_client_display()
+        st.session_state.waiting_for = None
+        st.session_state.last_agent_question = None
+        st.session_state.current_agent = "entrevista"
+        agent = get_current_agent()
+        return agent.send_message(
+            f"Entrevista finalizada! {result.get('mensagem')}. Agradeça e pergunte se deseja solicitar aumento de limite agora ou fazer outra coisa."
+        )
+    return agent.send_message(
+        f"Erro ao finalizar entrevista: {result.get('mensagem')}"
+    )
+
+
+def _handle_general(user_input: str) -> str:
+    """Answer a message that matches no flow or intent."""
+    agent = get_current_agent()
+    return agent.send_message(
+        f"O cliente disse: '{user_input}'. Responda de forma educada e pergunte como pode ajudar. Mencione as opções: consultar limite, aumentar limite, entrevista de crédito, consultar câmbio ou sair."
+    )
+
+
+# Handlers for answers the client owes before authenticating, and for values
+# asked for that take priority over keyword intents, keyed on
+# (current_agent, waiting_for)
+_STATE_HANDLERS = {
+    ("triagem", "cpf"): _handle_cpf,
+    ("triagem", "dob"): _handle_dob,
+    ("credito", "limit_value"): _handle_limit_value,
+    ("cambio", "from_currency"): _handle_from_currency,
+    ("cambio", "to_currency"): _handle_to_currency,
+}
+
+# Handlers for keyword intents, by the tag returned from classify_intent
+_INTENT_HANDLERS = {
+    "cambio": _handle_cambio_intent,
+    "limite": _handle_limite_intent,
+    "aumento": _handle_aumento_intent,
+    "entrevista": _handle_entrevista_intent,
+}
+
+# Handlers for interview answers, tried only when no keyword intent matches
+_INTERVIEW_HANDLERS = {
+    ("entrevista", "interview_renda"): _handle_interview_renda,
+    ("entrevista", "interview_emprego"): _handle_interview_emprego,
+    ("entrevista", "interview_despesas"): _handle_interview_despesas,
+    ("entrevista", "interview_dependentes"): _handle_interview_dependentes,
+    ("entrevista", "interview_dividas"): _handle_interview_dividas,
+}
+
+
+def tokenize(user_input: str) -> FrozenSet[str]:
+    """Split a message into its set of casefolded words."""
+    return frozenset(_WORD_RE.findall(user_input.casefold()))
+
+
+def classify_intent(words: FrozenSet[str]) -> Optional[str]:
+    """
+    Classify a message into a keyword intent.
+
+    Intents are checked in priority order: currency exchange comes before
+    the credit limit so messages mentioning both go to the exchange agent.
+
+    Args:
+        words: The user's message, as returned by tokenize
+
+    Returns:
+        The intent tag, or None if no keyword matched
+    """
+    if words & _CAMBIO_WORDS:
+        return "cambio"
+    if words & _LIMITE_WORDS and not words & _NOT_LIMITE_WORDS:
+        return "limite"
+    if words & _AUMENTO_WORDS and words & _CREDITO_WORDS:
+        return "aumento"
+    if words & _ENTREVISTA_WORDS:
+        return "entrevista"
+    return None
+
+
+def select_handler(user_input: str) -> Callable[[str], str]:
+    """
+    Pick the handler for a user message from the current session state.
+
+    Args:
+        user_input: The user's message
+
+    Returns:
+        Function that processes the message and returns the agent's response
+    """
+    key = (st.session_state.current_agent, st.session_state.waiting_for)
+
+    if not st.session_state.authenticated_client:
+        return _STATE_HANDLERS.get(key, _handle_not_authenticated)
+
+    words = tokenize(user_input)
+
+    # Exit has the highest priority, then a yes to the limit increase offer
+    if words & _EXIT_WORDS or any(phrase <= words for phrase in _EXIT_PHRASES):
+        return _handle_exit
+    if (
+        st.session_state.last_agent_question == "limit_increase_offer"
+        and words & _YES_WORDS
+    ):
+        return _handle_limit_offer_accepted
+
+    handler = _STATE_HANDLERS.get(key)
+    if handler is None:
+        handler = _INTENT_HANDLERS.get(classify_intent(words))
+    if handler is None:
+        handler = _INTERVIEW_HANDLERS.get(key, _handle_general)
+    return handler
+
+
+def process_user_message(user_input: str):
+    """Process user message and generate agent response."""
+    # Add user message to history, flagging birth dates so they are not saved
+    message = {"role": "user", "content": user_input}
+    if st.session_state.waiting_for == "dob":
+        message["sensitive"] = True
+    st.session_state.messages.append(message)
+
+    response = select_handler(user_input)(user_input)
+
     # Add agent response to history
     st.session_state.messages.append({"role": "assistant", "content": response})
+    save_session()
 
 
 def main():
@@ -470,11 +701,35 @@ def main():
         # Display chat messages
         chat_container = st.container(height=500)
         with chat_container:
-            for message in st.session_state.messages:
-                if message["role"] == "user":
-                    st.markdown(f"**👤 Você:** {message['content']}")
-                else:
-                    st.markdown(f"**🤖 Agente:** {message['content']}")
+            messages = st.session_state.messages
+            split = max(len(messages) - _VISIBLE_MESSAGES, 0)
+            if split:
+                with st.expander(f"Mostrar histórico ({split} mensagens)"):
+                    st.markdown("\n\n".join(map(format_message, islice(messages, split))))
+            if messages:
+                st.markdown("\n\n".join(map(format_message, islice(messages, split, None))))
+
+            # Stream the initial greeting instead of waiting for all of it
+            # The flag is cleared only once the stream ends, so a run
+            # interrupted mid-stream requests the greeting again
+            if st.session_state.get("pending_greeting"):
+                prefix = "**🤖 Agente:** "
+                chunks = StreamBuffer(interval_ms=_STREAM_INTERVAL_MS).wrap(
+                    get_agent("triagem").send_message_stream(GREETING_PROMPT)
+                )
+                try:
+                    greeting = st.write_stream(chain([prefix], chunks))[len(prefix):]
+                except Exception as e:
+                    del st.session_state.pending_greeting
+                    st.session_state.messages.append(
+                        {"role": "assistant", "content": f"Error calling Google Generative AI: {str(e)}"}
+                    )
+                    st.rerun()
+                del st.session_state.pending_greeting
+                st.session_state.messages.append(
+                    {"role": "assistant", "content": greeting}
+                )
+                get_greeting_cache()[GREETING_PROMPT] = greeting
         
         # Chat input
         if st.session_state.waiting_for != "finished":
@@ -485,7 +740,7 @@ def main():
         else:
             st.info("✅ Atendimento encerrado. Obrigado por usar o Banco Ágil!")
             if st.button("🔄 Iniciar Novo Atendimento"):
-                st.session_state.clear()
+                end_session()
                 st.rerun()
 
     with sidebar_col:
@@ -504,15 +759,11 @@ def main():
         if st.session_state.authenticated_client:
             st.markdown("---")
             st.subheader("👤 Cliente")
-            client = st.session_state.authenticated_client
-            st.markdown(f"**Nome:** {client.get('nome')}")
-            st.markdown(f"**CPF:** {client.get('cpf')[:3]}.***.***-{client.get('cpf')[-2:]}")
-            st.markdown(f"**Score:** {client.get('score_credito')}")
-            st.markdown(f"**Limite:** R$ {float(client.get('limite_credito', 0)):,.2f}")
+            st.markdown(st.session_state.client_display)
             
             st.markdown("---")
             if st.button("🔐 Encerrar Sessão"):
-                st.session_state.clear()
+                end_session()
                 st.rerun()
         else:
             st.info("👤 Aguardando autenticação...")
@@ -0,0 +1,95 @@
+"""
+Session store for the Streamlit UI.
+
+Checkpoints each chat session to a JSON file so a returning user resumes
+the conversation after a page reload or a server restart.
+"""
+
+import os
+import re
+import json
+import time
+from typing import Any, Dict, Optional
+
+SESSIONS_DIR = os.path.join(os.path.dirname(__file__), "..", "..", ".sessions")
+
+# Sessions untouched for longer than this are discarded
+SESSION_TTL_SECONDS = 3600
+
+_SESSION_ID_RE = re.compile(r"[0-9a-f]{32}")
+
+
+def is_valid_session_id(session_id: Optional[str]) -> bool:
+    """Check that a session id is a uuid4 hex string, safe to use as a filename."""
+    return session_id is not None and _SESSION_ID_RE.fullmatch(session_id) is not None
+
+
+def _session_file(session_id: str) -> str:
+    """Get the path of the checkpoint file for a session."""
+    return os.path.join(SESSIONS_DIR, f"{session_id}.json")
+
+
+def load_session(session_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Load a session checkpoint.
+
+    Args:
+        session_id: Session id
+
+    Returns:
+        The saved state, or None if missing, expired or unreadable
+    """
+    filepath = _session_file(session_id)
+    try:
+        if time.time() - os.path.getmtime(filepath) > SESSION_TTL_SECONDS:
+            os.remove(filepath)
+            return None
+        with open(filepath, "r", encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def save_session(session_id: str, state: Dict[str, Any]):
+    """
+    Save a session checkpoint, replacing the previous one atomically.
+
+    Args:
+        session_id: Session id
+        state: JSON-serializable session state
+    """
+    os.makedirs(SESSIONS_DIR, exist_ok=True)
+    filepath = _session_file(session_id)
+    tmp_path = f"{filepath}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump(state, file, ensure_ascii=False)
+    os.replace(tmp_path, filepath)
+
+
+def delete_session(session_id: str):
+    """
+    Delete a session checkpoint if it exists.
+
+    Args:
+        session_id: Session id
+    """
+    try:
+        os.remove(_session_file(session_id))
+    except FileNotFoundError:
+        pass
+
+
+def purge_expired_sessions():
+    """Delete all session checkpoints older than the TTL."""
+    try:
+        entries = list(os.scandir(SESSIONS_DIR))
+    except FileNotFoundError:
+        return
+
+    cutoff = time.time() - SESSION_TTL_SECONDS
+    for entry in entries:
+        try:
+            if entry.name.endswith(".json") and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+        except OSError:
+            pass
@@ -0,0 +1,77 @@
+"""
+Stream buffer for agent responses.
+
+Batches the small chunks yielded by a streaming model response so the UI
+is updated with fewer, larger pieces of text.
+"""
+
+import time
+from typing import Iterable, Iterator, List, Optional
+
+
+class StreamBuffer:
+    """Accumulates streamed text and releases it by size or by time."""
+
+    def __init__(self, size: int = 8192, interval_ms: int = 25):
+        """
+        Initialize the buffer.
+
+        Args:
+            size: Number of characters that forces a flush
+            interval_ms: Milliseconds after the last flush that force a flush
+        """
+        self.size = size
+        self.interval = interval_ms / 1000
+        self._chunks: List[str] = []
+        self._length = 0
+        self._last_flush = time.monotonic()
+
+    def push(self, chunk: str) -> Optional[str]:
+        """
+        Add a chunk to the buffer.
+
+        Args:
+            chunk: Text chunk from the stream
+
+        Returns:
+            The buffered text if a threshold was reached, None otherwise
+        """
+        self._chunks.append(chunk)
+        self._length += len(chunk)
+        if (
+            self._length >= self.size
+            or time.monotonic() - self._last_flush >= self.interval
+        ):
+            return self.flush()
+        return None
+
+    def flush(self) -> str:
+        """
+        Empty the buffer.
+
+        Returns:
+            The buffered text, possibly empty
+        """
+        text = "".join(self._chunks)
+        self._chunks.clear()
+        self._length = 0
+        self._last_flush = time.monotonic()
+        return text
+
+    def wrap(self, chunks: Iterable[str]) -> Iterator[str]:
+        """
+        Batch a chunk stream through the buffer.
+
+        Args:
+            chunks: Text chunks as produced by the model
+
+        Yields:
+            Batched text, the remainder flushed when the stream ends
+        """
+        for chunk in chunks:
+            text = self.push(chunk)
+            if text is not None:
+                yield text
+        text = self.flush()
+        if text:
+            yield text
@@ -5,7 +5,17 @@ Contains helper functions for validation and data processing.
 """
 
 import re
-from datetime import datetime
+from datetime import date, datetime
+
+# Deletes every Latin-1 character that is not a decimal digit
+_NON_DIGITS_TABLE = str.maketrans(
+    "", "", "".join(chr(c) for c in range(256) if not chr(c).isdecimal())
+)
+_NON_DIGIT_RE = re.compile(r"\D")
+
+# Drops the currency symbol, spaces and thousands separators and turns the
+# decimal comma into a dot
+_CURRENCY_TABLE = str.maketrans({"R": None, "$": None, " ": None, ".": None, ",": "."})
 
 
 def validate_cpf(cpf: str) -> bool:
@@ -18,15 +28,18 @@ def validate_cpf(cpf: str) -> bool:
     Returns:
         True if valid format, False otherwise
     """
-    # Remove any non-digit characters
-    cpf = re.sub(r"\D", "", cpf)
+    # Remove any non-digit characters, falling back to the regex only for
+    # input with characters outside Latin-1
+    cpf = cpf.translate(_NON_DIGITS_TABLE)
+    if not cpf.isdecimal():
+        cpf = _NON_DIGIT_RE.sub("", cpf)
 
     # Check length
     if len(cpf) != 11:
         return False
 
     # Check if all digits are the same
-    if len(set(cpf)) == 1:
+    if cpf == cpf[0] * 11:
         return False
 
     return True
@@ -63,6 +76,19 @@ def format_currency(value: float) -> str:
     return f"R$ {value:,.2f}".replace(",", ".")
 
 
+def clean_currency(value_str: str) -> str:
+    """
+    Strip a Brazilian currency string down to a float-parsable number.
+
+    Args:
+        value_str: Currency string, e.g. "R$ 1.234,56"
+
+    Returns:
+        The number with a dot as decimal separator, e.g. "1234.56"
+    """
+    return value_str.translate(_CURRENCY_TABLE)
+
+
 def parse_currency(value_str: str) -> float:
     """
     Parse Brazilian currency format to float.
@@ -73,10 +99,7 @@ def parse_currency(value_str: str) -> float:
     Returns:
         Float value
     """
-    # Remove R$, spaces, and dots
-    cleaned = value_str.replace("R$", "").replace(" ", "").replace(".", "")
-    # Replace comma with dot
-    cleaned = cleaned.replace(",", ".")
+    cleaned = clean_currency(value_str)
     try:
         return float(cleaned)
     except ValueError:
@@ -124,12 +147,19 @@ def calculate_age(birth_date: str) -> int:
     Returns:
         Age in years
     """
+    if len(birth_date) != 10 or birth_date[4] != "-" or birth_date[7] != "-":
+        return None
+    year, month, day = birth_date[0:4], birth_date[5:7], birth_date[8:10]
+    # int() would also take signs, spaces and underscores
+    digits = year + month + day
+    if not (digits.isascii() and digits.isdigit()):
+        return None
     try:
-        birth = datetime.strptime(birth_date, "%Y-%m-%d")
-        today = datetime.now()
-        age = today.year - birth.year - (
-            (today.month, today.day) < (birth.month, birth.day)
-        )
-        return age
+        # Slice the fixed YYYY-MM-DD layout; date() still rejects bad days
+        birth = date(int(year), int(month), int(day))
     except ValueError:
         return None
+    today = date.today()
+    return today.year - birth.year - (
+        (today.month, today.day) < (birth.month, birth.day)
+    )